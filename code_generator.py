@@ -10,9 +10,67 @@ from config import Config
 import json
 import time
 import random
+from bisect import bisect
+from itertools import accumulate
 from models.flux import FluxGenerator
 from models.validation import CodeValidator
 
+# Method signatures: optional modifiers, return type, name and parameter list
+_METHOD_SIGNATURE_RE = re.compile(r'(?:public\s+|private\s+)?(?:static\s+)?(\w+)\s+(\w+)\s*\(([\w\s,<>[\]]*)\)')
+# Markdown fences around a response
+_MD_FENCE_HEAD_RE = re.compile(r'^```.*?\n')
+_MD_FENCE_TAIL_RE = re.compile(r'\n```.*?$')
+# Chained letterMask references, with or without spaces around the dots
+_DOUBLE_MASK_RE = re.compile(r'(?:letterMask\s*\.\s*)+letterMask')
+_RENDER_PATH_RE = re.compile(r'(String\s+renderPath\s*=\s*)"[^"]*"')
+
+# Retry-prompt fixes keyed by error substring; matched case-insensitively, so keys are stored lowercased
+_TARGETED_FIXES = tuple((pattern.lower(), guidance) for pattern, guidance in {
+    "NullPointerException": "• Check all variables are initialized before use\n• Verify object creation in initSketch()",
+    "ArrayIndexOutOfBounds": "• Verify array indices are within bounds\n• Check array initialization sizes",
+    "cannot find symbol": "• Ensure all variables are declared\n• Check for typos in variable names",
+    "incompatible types": "• Verify variable type assignments\n• Check function return types",
+    "Missing semicolon": "• Add missing semicolons at line ends\n• Check statement termination",
+    "letterMask": "• Initialize letterMask in initSketch()\n• Follow text rendering sequence",
+    "translate": "• Remove translate() calls\n• Use relative coordinates from (0,0)",
+    "setup": "• Remove setup() and draw()\n• Use only initSketch() and runSketch()",
+}.items())
+
+# Error-type guidance keyed by error substring, lowercased like _TARGETED_FIXES
+_ERROR_GUIDANCE = tuple((pattern.lower(), guidance) for pattern, guidance in {
+    "translate": """• DO NOT use translate() - all positioning should be relative to canvas center (0,0)
+• Use direct x,y coordinates: x = width/2 + offset
+• For rotations, use rotate() with pushMatrix/popMatrix
+• Remember the canvas is already centered""",
+
+    "Creative validation": """• Remove any setup/draw function declarations
+• Ensure no background or translate calls
+• Use only the provided progress variable
+• Keep code focused on the creative elements
+• Initialize all variables in initSketch()""",
+
+    "Core validation": """• Ensure code fits within the template structure
+• Check for proper loop completion
+• Verify all variables are properly scoped
+• Remove any conflicting declarations
+• Use Processing-specific syntax""",
+
+    "letterMask": """• Declare PGraphics letterMask at the top
+• Initialize in initSketch() with createGraphics()
+• Use proper text rendering sequence
+• Check text positioning and size""",
+
+    "NullPointerException": """• Initialize all variables before use
+• Check object creation in initSketch()
+• Verify array/list initialization
+• Debug variable scope issues""",
+
+    "ArrayIndexOutOfBounds": """• Check array size calculations
+• Verify index bounds in loops
+• Initialize arrays with proper size
+• Use array.length or list.size() for bounds""",
+}.items())
+
 class ProcessingGenerator:
     def __init__(self, config: Config, logger: ArtLogger = None):
         """Initialize the code generator with configuration"""
@@ -50,6 +108,11 @@ class ProcessingGenerator:
             'flux': self.flux_generator
         }
         self._current_model = None
+        
+        # Model names and cumulative weights for weighted random selection
+        model_weights = config.get_model_config()['model_weights']
+        self._model_names = tuple(model_weights)
+        self._model_cum_weights = tuple(accumulate(model_weights.values()))
     
     # === Public Interface ===
     def generate_new_iteration(self, selected_techniques: List[Technique], version: int) -> str:
@@ -284,8 +347,7 @@ The system automatically handles these - DO NOT include them:
         """Check for duplicate method signatures in the code"""
         try:
             # Extract method signatures using regex
-            method_pattern = r'(?:public\s+|private\s+)?(?:static\s+)?(\w+)\s+(\w+)\s*\(([\w\s,<>[\]]*)\)'
-            methods = re.finditer(method_pattern, code)
+            methods = _METHOD_SIGNATURE_RE.finditer(code)
             
             # Store signatures for comparison
             signatures = set()
@@ -313,17 +375,17 @@ The system automatically handles these - DO NOT include them:
         """Clean and insert code into template with proper structure"""
         try:
             # Remove markdown artifacts
-            code = re.sub(r'^```.*?\n', '', code)
-            code = re.sub(r'\n```.*?$', '', code)
+            code = _MD_FENCE_HEAD_RE.sub('', code)
+            code = _MD_FENCE_TAIL_RE.sub('', code)
             code = code.strip()
             
             # Clean special characters and ensure ASCII compatibility
-            code = code.encode('ascii', 'ignore').decode()  # Remove non-ASCII chars
-            code = re.sub(r'[^\x00-\x7F]+', '', code)  # Additional non-ASCII cleanup
+            if not code.isascii():
+                code = code.encode('ascii', 'ignore').decode('ascii')  # Remove non-ASCII chars
             
             # Fix common letterMask issues
-            code = re.sub(r'letterMask\.letterMask', 'letterMask', code)  # Fix double reference
-            code = re.sub(r'letterMask\s*\.\s*letterMask', 'letterMask', code)  # Fix with spaces
+            if 'letterMask' in code:
+                code = _DOUBLE_MASK_RE.sub('letterMask', code)  # Fix doubled references, with or without spaces
             
             # Extract just the user's creative code
             user_code = self._extract_user_code(code)
@@ -359,17 +421,20 @@ The system automatically handles these - DO NOT include them:
     def _extract_user_code(self, code: str) -> Optional[str]:
         """Extract user's creative code from between markers"""
         try:
-            # Split on markers
-            parts = code.split("// YOUR CREATIVE CODE GOES HERE")
-            if len(parts) < 2:
+            start_marker = "// YOUR CREATIVE CODE GOES HERE"
+            start = code.find(start_marker)
+            if start == -1:
                 return code.strip()  # Return whole code if no markers
-            
-            code = parts[1]
-            parts = code.split("// END OF YOUR CREATIVE CODE")
-            if len(parts) < 1:
-                return code.strip()
+            start += len(start_marker)
+            
+            # Stop at a repeated start marker or the end marker, whichever comes first
+            end = len(code)
+            for marker in (start_marker, "// END OF YOUR CREATIVE CODE"):
+                idx = code.find(marker, start, end)
+                if idx != -1:
+                    end = idx
                 
-            return parts[0].strip()
+            return code[start:end].strip()
             
         except Exception as e:
             self.log.error(f"Error extracting user code: {e}")
@@ -380,24 +445,11 @@ The system automatically handles these - DO NOT include them:
         """Build error prompt for retry attempts with improved guidance"""
         specific_guidance = self._get_error_guidance(error_msg)
         
-        # Extract key error patterns
-        error_patterns = {
-            "NullPointerException": "• Check all variables are initialized before use\n• Verify object creation in initSketch()",
-            "ArrayIndexOutOfBounds": "• Verify array indices are within bounds\n• Check array initialization sizes",
-            "cannot find symbol": "• Ensure all variables are declared\n• Check for typos in variable names",
-            "incompatible types": "• Verify variable type assignments\n• Check function return types",
-            "Missing semicolon": "• Add missing semicolons at line ends\n• Check statement termination",
-            "letterMask": "• Initialize letterMask in initSketch()\n• Follow text rendering sequence",
-            "translate": "• Remove translate() calls\n• Use relative coordinates from (0,0)",
-            "setup": "• Remove setup() and draw()\n• Use only initSketch() and runSketch()",
-        }
-        
         # Build targeted guidance based on error patterns
         targeted_guidance = []
         if error_msg:
-            for pattern, guidance in error_patterns.items():
-                if pattern.lower() in error_msg.lower():
-                    targeted_guidance.append(guidance)
+            error_lower = error_msg.lower()
+            targeted_guidance = [guidance for pattern, guidance in _TARGETED_FIXES if pattern in error_lower]
         
         error_context = f"""Previous attempt had issues that need to be fixed:
 ERROR: {error_msg if error_msg else 'Unknown error'}
@@ -427,46 +479,9 @@ Please fix these issues and return the corrected code."""
         if not error_msg:
             return "• Try a simpler approach with cleaner code structure\n• Focus on core functionality"
         
-        # Common error patterns and their specific guidance
-        error_patterns = {
-            "translate": """• DO NOT use translate() - all positioning should be relative to canvas center (0,0)
-• Use direct x,y coordinates: x = width/2 + offset
-• For rotations, use rotate() with pushMatrix/popMatrix
-• Remember the canvas is already centered""",
-            
-            "Creative validation": """• Remove any setup/draw function declarations
-• Ensure no background or translate calls
-• Use only the provided progress variable
-• Keep code focused on the creative elements
-• Initialize all variables in initSketch()""",
-            
-            "Core validation": """• Ensure code fits within the template structure
-• Check for proper loop completion
-• Verify all variables are properly scoped
-• Remove any conflicting declarations
-• Use Processing-specific syntax""",
-            
-            "letterMask": """• Declare PGraphics letterMask at the top
-• Initialize in initSketch() with createGraphics()
-• Use proper text rendering sequence
-• Check text positioning and size""",
-            
-            "NullPointerException": """• Initialize all variables before use
-• Check object creation in initSketch()
-• Verify array/list initialization
-• Debug variable scope issues""",
-            
-            "ArrayIndexOutOfBounds": """• Check array size calculations
-• Verify index bounds in loops
-• Initialize arrays with proper size
-• Use array.length or list.size() for bounds""",
-        }
-        
         # Find matching patterns and combine guidance
-        guidance = []
-        for pattern, specific_guidance in error_patterns.items():
-            if pattern.lower() in error_msg.lower():
-                guidance.append(specific_guidance)
+        error_lower = error_msg.lower()
+        guidance = [specific_guidance for pattern, specific_guidance in _ERROR_GUIDANCE if pattern in error_lower]
         
         if guidance:
             return "\n\n".join(guidance)
@@ -539,11 +554,7 @@ void draw() {{
     
     def _update_render_path(self, code: str, version: int) -> str:
         """Update render path in code"""
-        return re.sub(
-            r'(String\s+renderPath\s*=\s*)"[^"]*"',
-            fr'\1"renders/render_v{version}"',
-            code
-        )
+        return _RENDER_PATH_RE.sub(fr'\1"renders/render_v{version}"', code)
     
     def run_sketch(self, render_path: Path) -> tuple[bool, Optional[str]]:
         """Run Processing sketch and generate frames"""
@@ -662,10 +673,8 @@ void draw() {{
         if model_config['model_selection'] != 'random':
             return model_config['model_selection']
         
-        weights = model_config['model_weights']
-        models = list(weights.keys())
-        probabilities = list(weights.values())
-        return random.choices(models, weights=probabilities, k=1)[0]
+        # Same draw random.choices makes, without rebuilding the lists each call
+        return self._model_names[bisect(self._model_cum_weights, random.random() * self._model_cum_weights[-1], 0, len(self._model_cum_weights) - 1)]
     
     def _build_simpler_prompt(self, original_prompt: str) -> str:
         """Build a simpler prompt when model returns no code"""
@@ -46,7 +46,28 @@ class Config:
                 'claude-3-opus': 0.2,   
                 'claude-3.5-sonnet': 0.1, 
                 'flux': 0.1  # Flux with internal variants
-            }
+            },
+            # Reuse validated responses for repeated prompts, per generator with its
+            # own store; off by default since a cache hit returns the same artwork again
+            'response_cache': {
+                '4o': {
+                    'enabled': False,
+                    'semantic': False,  # Also match near-duplicate prompts by embedding
+                    'similarity_threshold': 0.95,
+                    'path': self.data_dir / "prompt_cache_4o"
+                },
+                'o1': {
+                    'enabled': False,
+                    'semantic': False,  # Near-duplicate matches stay within this generator
+                    'similarity_threshold': 0.95,
+                    'path': self.data_dir / "prompt_cache_o1"
+                }
+            },
+            # Completions requested per o1 attempt; the first one that validates is used.
+            # Leave at 1 unless the selected o1 model accepts n > 1
+            'speculative_n': 1,
+            # Stream o1 completions and stop as soon as a forbidden call shows up
+            'stream_responses': True
         }
         
         # Static Image Generation Configuration
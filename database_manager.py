@@ -166,39 +166,52 @@ class DatabaseManager:
     def get_recent_patterns(self, limit: int = 3) -> List[Pattern]:
         """Get most recent patterns"""
         conn = self.get_connection()
+        try:
+            return self._fetch_recent_patterns(conn.cursor(), limit)
+        finally:
+            conn.close()
+    
+    def get_prompt_context(self, recent_limit: int = 3, history_limit: int = 5) -> tuple[List[Pattern], List[List[str]]]:
+        """Get recent patterns and historical techniques over a single connection"""
+        conn = self.get_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT version, code, timestamp, techniques, model,
-                       parameters, creative_approach, score,
-                       innovation_score, aesthetic_score, mathematical_complexity,
-                       motion_quality, visual_coherence, technique_synergy,
-                       parent_patterns
-                FROM patterns 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            """, (limit,))
-            
-            return [Pattern(
-                version=row[0],
-                code=row[1],
-                timestamp=datetime.fromisoformat(row[2]),
-                techniques=json.loads(row[3]) if row[3] else [],
-                model=row[4],
-                parameters=json.loads(row[5]) if row[5] else {},
-                creative_approach=json.loads(row[6]) if row[6] else {},
-                score=row[7],
-                innovation_score=row[8],
-                aesthetic_score=row[9],
-                mathematical_complexity=row[10],
-                motion_quality=row[11],
-                visual_coherence=row[12],
-                technique_synergy=row[13],
-                parent_patterns=json.loads(row[14]) if row[14] else []
-            ) for row in cursor.fetchall()]
+            return (self._fetch_recent_patterns(cursor, recent_limit),
+                    self._fetch_historical_techniques(cursor, history_limit))
         finally:
             conn.close()
     
+    def _fetch_recent_patterns(self, cursor: sqlite3.Cursor, limit: int) -> List[Pattern]:
+        """Most recent patterns using an open cursor"""
+        cursor.execute("""
+            SELECT version, code, timestamp, techniques, model,
+                   parameters, creative_approach, score,
+                   innovation_score, aesthetic_score, mathematical_complexity,
+                   motion_quality, visual_coherence, technique_synergy,
+                   parent_patterns
+            FROM patterns 
+            ORDER BY timestamp DESC 
+            LIMIT ?
+        """, (limit,))
+        
+        return [Pattern(
+            version=row[0],
+            code=row[1],
+            timestamp=datetime.fromisoformat(row[2]),
+            techniques=json.loads(row[3]) if row[3] else [],
+            model=row[4],
+            parameters=json.loads(row[5]) if row[5] else {},
+            creative_approach=json.loads(row[6]) if row[6] else {},
+            score=row[7],
+            innovation_score=row[8],
+            aesthetic_score=row[9],
+            mathematical_complexity=row[10],
+            motion_quality=row[11],
+            visual_coherence=row[12],
+            technique_synergy=row[13],
+            parent_patterns=json.loads(row[14]) if row[14] else []
+        ) for row in cursor.fetchall()]
+    
     def get_successful_patterns(self, min_score: float = 75.0, limit: int = 5) -> List[Pattern]:
         """Get patterns with score above threshold"""
         with sqlite3.connect(self.db_path) as conn:
@@ -521,20 +534,23 @@ class DatabaseManager:
         """Get techniques used in recent patterns"""
         conn = self.get_connection()
         try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT techniques
-                FROM patterns
-                WHERE techniques IS NOT NULL
-                ORDER BY timestamp DESC
-                LIMIT ?
-            """, (limit,))
-            
-            return [json.loads(row[0]) if row[0] else [] 
-                   for row in cursor.fetchall()]
+            return self._fetch_historical_techniques(conn.cursor(), limit)
         finally:
             conn.close()
     
+    def _fetch_historical_techniques(self, cursor: sqlite3.Cursor, limit: int) -> List[List[str]]:
+        """Techniques of the most recent patterns using an open cursor"""
+        cursor.execute("""
+            SELECT techniques
+            FROM patterns
+            WHERE techniques IS NOT NULL
+            ORDER BY timestamp DESC
+            LIMIT ?
+        """, (limit,))
+        
+        return [json.loads(row[0]) if row[0] else [] 
+               for row in cursor.fetchall()]
+    
     def ensure_version_exists(self, version: int) -> None:
         """Ensure a version exists in the database, creating placeholder if needed"""
         with sqlite3.connect(self.db_path) as conn:
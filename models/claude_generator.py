@@ -4,9 +4,67 @@ from anthropic import Anthropic
 from logger import ArtLogger
 from config import Config
 import random
+import time
+from itertools import chain
 import os
 import subprocess
 
+# Avoid patterns come from the database and only change as new sketches are saved
+_AVOID_PATTERNS_TTL = 30.0
+
+# setup()/draw() bodies and the calls the template already makes
+_SYSTEM_CALLS_RE = re.compile(
+    r'void\s+(?:setup|draw)\s*\(\s*\)\s*{[^}]*}'
+    r'|\s*(?:background|size|frameRate|saveFrame)\([^)]*\);'
+    r'|\s*translate\((?:width|height)/2[^)]*\);'
+    r'|\s*exit\(\);'
+)
+# Substrings every _SYSTEM_CALLS_RE match contains; code without any of them is left as-is
+_SYSTEM_CALL_TERMS = (
+    'setup', 'draw', 'background(', 'size(', 'frameRate(', 'saveFrame(',
+    'translate(width/2', 'translate(height/2', 'exit(',
+)
+
+# Code glued to a following function declaration, e.g. a comment line merged with "void f("
+_MERGED_DECLARATION_RE = re.compile(r'([^\n]+)void\s+(\w+)\s*\(')
+
+# Template structure that must survive generation, each with a literal its match contains
+_CORE_REQUIREMENTS = (
+    ('void setup()', re.compile(r'void setup\(\)\s*{[^}]*size\(1080,\s*1080\)[^}]*}', re.DOTALL), "setup() function modified"),
+    ('void draw()', re.compile(r'void draw\(\)\s*{.*background\(0\).*translate\(width/2,\s*height/2\)', re.DOTALL), "draw() function header modified"),
+    ('renderPath', re.compile(r'String\s+renderPath\s*=\s*"renders/render_v\d+"', re.DOTALL), "renderPath declaration missing/modified"),
+    ('saveFrame(renderPath', re.compile(r'saveFrame\(renderPath\s*\+\s*"/frame-####\.png"\)', re.DOTALL), "saveFrame call missing/modified"),
+)
+
+# renderPath declaration in prism.pde, rewritten to point at the next render folder
+_RENDER_PATH_RE = re.compile(r'String\s+renderPath\s*=\s*"renders/render_v\d+"')
+
+# JavaScript -> Processing conversions
+_JS_DECL_RE = re.compile(r'\b(let|const|var)\s+(\w+)\s*=')
+_JS_FOR_DECL_RE = re.compile(r'for\s*\(\s*(let|const|var)\s+(\w+)')
+_JS_ARROW_LOOP_RE = re.compile(r'\.(?:forEach|map)\s*\(\s*\w+\s*=>\s*{')
+_HEX_COLOR_RE = re.compile(r'#([0-9a-fA-F]{6})')
+_JS_MATH_RE = re.compile(r'Math\.(PI|sin|cos|random|abs|min|max)')
+
+# Critical JavaScript syntax that can't be auto-fixed, each with a literal its matches contain
+_CRITICAL_JS_PATTERNS = (
+    ('#', re.compile(r'color\(([\'"]#[0-9a-fA-F]+[\'"]\))'), "Use RGB values instead of hex codes"),
+    ('push', re.compile(r'\bpush\s*\(\s*\)'), "Use pushMatrix()/popMatrix()"),
+    ('pop', re.compile(r'\bpop\s*\(\s*\)'), "Use pushMatrix()/popMatrix()"),
+    ('createVector', re.compile(r'createVector\s*\('), "Use 'new PVector()'"),
+)
+
+# Markdown fences with an optional language tag; also matches bare ``` runs
+_MD_FENCE_RE = re.compile(r'```\w*\n?')
+
+# Creative code markers the model is asked to wrap its answer in
+_START_MARKER = "// YOUR CREATIVE CODE GOES HERE"
+_END_MARKER = "// END OF YOUR CREATIVE CODE"
+
+# Streamed responses: the creative block is rescanned for critical syntax every N new characters
+_STREAM_CHECK_INTERVAL = 200
+_STREAM_CHECK_OVERLAP = 64
+
 class ClaudeGenerator:
     def __init__(self, config: Config, logger: ArtLogger = None):
         self.config = config
@@ -27,6 +85,13 @@ class ClaudeGenerator:
             'claude-3-opus': 'claude-3-opus-20240229',
             'claude-3.5-sonnet': 'claude-3-5-sonnet-20241022'
         }
+        # (fetched_at, avoid_patterns) from the last database lookup
+        self._avoid_cache: Tuple[float, List[str]] = (0.0, [])
+        # Immutable snapshot of the technique categories used for random picks
+        self._technique_categories = {
+            category: tuple(techniques)
+            for category, techniques in config.technique_categories.items()
+        }
     
     def _select_claude_model(self, model: str = None) -> str:
         """Get the appropriate Claude model to use"""
@@ -73,7 +138,8 @@ Beyond these basics, you have complete creative freedom. Let your artistic visio
                 
             self.log.debug(f"Using model ID: {model_id} (from {self.current_model})")
             
-            response = self.client.messages.create(
+            # Stream so critical JavaScript syntax can end the request before the last token
+            with self.client.messages.stream(
                 model=model_id,
                 max_tokens=4096,
                 messages=[
@@ -81,8 +147,11 @@ Beyond these basics, you have complete creative freedom. Let your artistic visio
                 ],
                 system=system_prompt,
                 temperature=0.8,
-                stop_sequences=["// END OF YOUR CREATIVE CODE"]
-            )
+                stop_sequences=[_END_MARKER]
+            ) as stream:
+                if self._collect_stream(stream.text_stream) is None:
+                    return None
+                response = stream.get_final_message()
             
             if not response.content:
                 self.log.error("No response generated from AI")
@@ -127,8 +196,7 @@ Beyond these basics, you have complete creative freedom. Let your artistic visio
             
             # Update render path in template
             next_version = self.config.get_next_version()
-            template = re.sub(
-                r'String\s+renderPath\s*=\s*"renders/render_v\d+"',
+            template = _RENDER_PATH_RE.sub(
                 f'String renderPath = "renders/render_v{next_version}"',
                 template
             )
@@ -137,19 +205,17 @@ Beyond these basics, you have complete creative freedom. Let your artistic visio
             start_marker = "// === USER'S CREATIVE CODE ==="
             end_marker = "// === SYSTEM FRAMEWORK ==="
             
-            parts = template.split(start_marker)
-            if len(parts) != 2:
+            # Each marker must appear exactly once
+            before_marker, found, rest = template.partition(start_marker)
+            if not found or start_marker in rest:
                 self.log.error("Could not find start marker in template")
                 return None
             
-            before_marker = parts[0]
-            parts = parts[1].split(end_marker)
-            if len(parts) != 2:
+            _, found, after_marker = rest.partition(end_marker)
+            if not found or end_marker in after_marker:
                 self.log.error("Could not find end marker in template")
                 return None
             
-            after_marker = parts[1]
-            
             # Combine with template, preserving the exact marker format
             full_code = (
                 before_marker + 
@@ -174,9 +240,7 @@ Beyond these basics, you have complete creative freedom. Let your artistic visio
     def _build_generation_prompt(self, techniques: str, custom_guidelines: str = "") -> str:
         """Build a focused creative prompt with clearer guidance"""
         # Get historical patterns to avoid repetition
-        recent_patterns = self.config.db_manager.get_recent_patterns(limit=3)
-        historical_techniques = self.config.db_manager.get_historical_techniques(limit=5)
-        avoid_patterns = self._get_avoid_patterns(recent_patterns, historical_techniques)
+        avoid_patterns = self._get_cached_avoid_patterns()
         
         # Get random subset of techniques from each category for inspiration
         geometry_techniques = self._get_random_techniques_from_category('geometry', 3)
@@ -233,31 +297,45 @@ Return your code between these markers:
 // YOUR CREATIVE CODE GOES HERE
 // END OF YOUR CREATIVE CODE"""
 
+    def _get_cached_avoid_patterns(self) -> List[str]:
+        """Get avoid patterns, refetching from the database at most every _AVOID_PATTERNS_TTL seconds"""
+        fetched_at, avoid_patterns = self._avoid_cache
+        now = time.monotonic()
+        if fetched_at and now - fetched_at < _AVOID_PATTERNS_TTL:
+            return avoid_patterns
+        
+        recent_patterns, historical_techniques = self.config.db_manager.get_prompt_context(
+            recent_limit=3, history_limit=5
+        )
+        avoid_patterns = self._get_avoid_patterns(recent_patterns, historical_techniques)
+        self._avoid_cache = (now, avoid_patterns)
+        return avoid_patterns
+
     def _get_avoid_patterns(self, recent_patterns, historical_techniques, max_avoid=5) -> List[str]:
         """Helper method to build list of patterns to avoid"""
-        avoid_patterns = []
-        
-        # Add techniques from recent patterns
-        if recent_patterns:
-            recent_techniques = [tech for pattern in recent_patterns for tech in pattern.techniques]
-            avoid_patterns.extend(recent_techniques)
+        # Techniques from recent patterns first, then the most common historical ones
+        recent_techniques = chain.from_iterable(pattern.techniques for pattern in recent_patterns or ())
+        # History is a handful of short lists, so a plain dict count beats Counter.most_common;
+        # the stable sort keeps first-seen order among ties, as most_common does
+        counts = {}
+        for tech in chain.from_iterable(historical_techniques or ()):
+            counts[tech] = counts.get(tech, 0) + 1
+        common_techniques = sorted(counts, key=counts.__getitem__, reverse=True)[:3]
         
-        # Add commonly used historical techniques
-        if historical_techniques:
-            recent_combos = [tech for pattern in historical_techniques for tech in pattern]
-            from collections import Counter
-            common_techniques = Counter(recent_combos).most_common(3)
-            avoid_patterns.extend(tech for tech, _ in common_techniques)
-        
-        # Remove duplicates and limit
-        return list(dict.fromkeys(avoid_patterns))[:max_avoid]
+        # Remove duplicates (keeping first-seen order) and stop once the limit is reached
+        avoid_patterns = {}
+        for tech in chain(recent_techniques, common_techniques):
+            if len(avoid_patterns) >= max_avoid:
+                break
+            avoid_patterns[tech] = None
+        return list(avoid_patterns)
 
     def _get_random_techniques_from_category(self, category: str, count: int = 3) -> List[str]:
         """Get random techniques from a specific category in config"""
-        if category not in self.config.technique_categories:
+        techniques = self._technique_categories.get(category)
+        if techniques is None:
             return []
         
-        techniques = self.config.technique_categories[category]
         # Ensure we don't try to get more items than available
         count = min(count, len(techniques))
         return random.sample(techniques, count)
@@ -269,7 +347,7 @@ Return your code between these markers:
             code = self._remove_system_calls(code)
             
             # Fix malformed function declarations where comments merge with function
-            code = re.sub(r'([^\n]+)void\s+(\w+)\s*\(', r'\1\nvoid \2(', code)
+            code = _MERGED_DECLARATION_RE.sub(r'\1\nvoid \2(', code)
             
             code = code.strip()
             
@@ -287,38 +365,23 @@ Return your code between these markers:
 
     def _remove_system_calls(self, code: str) -> str:
         """Remove system calls that are handled by the framework"""
-        # Remove any setup() or draw() functions
-        code = re.sub(r'void\s+setup\s*\(\s*\)\s*{[^}]*}', '', code)
-        code = re.sub(r'void\s+draw\s*\(\s*\)\s*{[^}]*}', '', code)
-        
-        # Remove any system calls that are handled by the framework
-        code = re.sub(r'\s*background\([^)]*\);', '', code)
-        code = re.sub(r'\s*size\([^)]*\);', '', code)
-        code = re.sub(r'\s*frameRate\([^)]*\);', '', code)
-        code = re.sub(r'\s*translate\(width/2[^)]*\);', '', code)
-        code = re.sub(r'\s*translate\(height/2[^)]*\);', '', code)
-        code = re.sub(r'\s*saveFrame\([^)]*\);', '', code)
-        code = re.sub(r'\s*exit\(\);', '', code)
-        
-        return code
+        # Remove setup()/draw() functions and framework-handled calls in one pass
+        if not any(term in code for term in _SYSTEM_CALL_TERMS):
+            return code
+        return _SYSTEM_CALLS_RE.sub('', code)
 
     def _extract_code_from_response(self, content: str) -> Optional[str]:
         """Extract and clean user code from AI response without template wrapping"""
         try:
             # Clean special characters and ensure ASCII compatibility
-            content = content.encode('ascii', 'ignore').decode()
-            content = re.sub(r'[^\x00-\x7F]+', '', content)
+            if not content.isascii():
+                content = content.encode('ascii', 'ignore').decode('ascii')
             
             # Remove ALL backticks and language markers
-            content = re.sub(r'```\w*\n?', '', content)
-            content = content.replace('```', '')
+            content = _MD_FENCE_RE.sub('', content)
             
             # Extract code between markers
-            code = self._extract_between_markers(
-                content,
-                "// YOUR CREATIVE CODE GOES HERE",
-                "// END OF YOUR CREATIVE CODE"
-            )
+            code = self._extract_between_markers(content, _START_MARKER, _END_MARKER)
             
             # Clean and prepare code
             return self._clean_code(code)
@@ -327,17 +390,69 @@ Return your code between these markers:
             self.log.error(f"Error extracting code: {str(e)}")
             return None
 
+    def _collect_stream(self, text_stream) -> Optional[str]:
+        """Accumulate streamed text.
+        
+        Returns None as soon as critical JavaScript syntax shows up in the
+        creative code block, since _is_safe_code would reject the result anyway.
+        """
+        content = ""
+        scanned = 0
+        for delta in text_stream:
+            content += delta
+            
+            # Only rescan once enough new text has arrived
+            if len(content) - scanned < _STREAM_CHECK_INTERVAL:
+                continue
+            error = self._scan_stream(content, scanned)
+            if error:
+                self.log.error(f"Critical JavaScript syntax found: {error}")
+                return None
+            scanned = len(content)
+        
+        return content
+
+    def _scan_stream(self, content: str, scanned: int) -> Optional[str]:
+        """Check the creative block received so far for critical syntax.
+        
+        Only text that extraction leaves untouched is scanned: ASCII without markdown
+        fences, up to the first term _remove_system_calls could strip.
+        """
+        start = content.find(_START_MARKER)
+        if start == -1:
+            return None
+        body = start + len(_START_MARKER)
+        
+        limit = len(content)
+        for term in chain((_START_MARKER, _END_MARKER), _SYSTEM_CALL_TERMS):
+            idx = content.find(term, body, limit)
+            if idx != -1:
+                limit = idx
+        prefix = content[:limit]
+        if not prefix.isascii() or '`' in prefix:
+            return None
+        
+        # Overlap the previous window so patterns split across chunks are caught
+        window_start = max(body, scanned - _STREAM_CHECK_OVERLAP)
+        for literal, pattern, error in _CRITICAL_JS_PATTERNS:
+            if pattern.search(content, window_start, limit):
+                return error
+        return None
+
     def _extract_between_markers(self, code: str, start_marker: str, end_marker: str) -> str:
         """Extract code between markers for validation"""
         try:
-            parts = code.split(start_marker)
-            if len(parts) < 2:
+            start = code.find(start_marker)
+            if start == -1:
                 return code
-            code = parts[1]
-            parts = code.split(end_marker)
-            if len(parts) < 1:
-                return code
-            return parts[0].strip()
+            start += len(start_marker)
+            # Stop at a repeated start marker or the end marker, whichever comes first
+            end = len(code)
+            for marker in (start_marker, end_marker):
+                idx = code.find(marker, start, end)
+                if idx != -1:
+                    end = idx
+            return code[start:end].strip()
         except Exception as e:
             self.log.error(f"Error extracting between markers: {e}")
             return code
@@ -355,61 +470,42 @@ Return your code between these markers:
 
     def validate_core_requirements(self, code: str) -> tuple[bool, str]:
         """Validate only essential Processing code requirements, being more lenient"""
-        # Only validate the critical template structure
-        required_structure = [
-            (r'void setup\(\)\s*{[^}]*size\(1080,\s*1080\)[^}]*}', "setup() function modified"),
-            (r'void draw\(\)\s*{.*background\(0\).*translate\(width/2,\s*height/2\)', "draw() function header modified"),
-            (r'String\s+renderPath\s*=\s*"renders/render_v\d+"', "renderPath declaration missing/modified"),
-            (r'saveFrame\(renderPath\s*\+\s*"/frame-####\.png"\)', "saveFrame call missing/modified")
-        ]
-        
-        for pattern, error in required_structure:
-            if not re.search(pattern, code, re.DOTALL):
+        # Only validate the critical template structure; the literal each regex
+        # requires is checked first so a missing piece fails without regex work
+        for literal, pattern, error in _CORE_REQUIREMENTS:
+            if literal not in code or not pattern.search(code):
                 return False, error
         
         return True, None
 
     def _convert_to_processing(self, code: str) -> str:
         """Convert JavaScript syntax to Processing syntax"""
-        # Replace variable declarations
-        code = re.sub(r'\b(let|const|var)\s+(\w+)\s*=', r'float \2 =', code)
-        
-        # Fix for loop syntax
-        code = re.sub(r'for\s*\(\s*(let|const|var)\s+(\w+)', r'for (int \2', code)
+        # Every rewrite needs a literal from its pattern, so absent ones skip the regex pass
+        if 'let' in code or 'const' in code or 'var' in code:
+            # Replace variable declarations
+            code = _JS_DECL_RE.sub(r'float \2 =', code)
+            
+            # Fix for loop syntax
+            code = _JS_FOR_DECL_RE.sub(r'for (int \2', code)
         
         # Replace forEach/map with for loops
-        code = re.sub(r'\.forEach\s*\(\s*\w+\s*=>\s*{', r') {', code)
-        code = re.sub(r'\.map\s*\(\s*\w+\s*=>\s*{', r') {', code)
+        if '=>' in code:
+            code = _JS_ARROW_LOOP_RE.sub(r') {', code)
         
         # Fix color syntax if needed
-        code = re.sub(r'#([0-9a-fA-F]{6})', lambda m: f'color({int(m.group(1)[:2], 16)}, {int(m.group(1)[2:4], 16)}, {int(m.group(1)[4:], 16)})', code)
+        if '#' in code:
+            code = _HEX_COLOR_RE.sub(lambda m: f'color({int(m.group(1)[:2], 16)}, {int(m.group(1)[2:4], 16)}, {int(m.group(1)[4:], 16)})', code)
         
         # Fix Math functions
-        math_funcs = {
-            'Math.PI': 'PI',
-            'Math.sin': 'sin',
-            'Math.cos': 'cos',
-            'Math.random': 'random',
-            'Math.abs': 'abs',
-            'Math.min': 'min',
-            'Math.max': 'max'
-        }
-        for js, proc in math_funcs.items():
-            code = code.replace(js, proc)
-        
-        return code 
+        if 'Math.' in code:
+            code = _JS_MATH_RE.sub(r'\1', code)
+        return code
 
     def _is_safe_code(self, code: str) -> bool:
         """Basic safety validation"""
         # Only check for critical JavaScript syntax that can't be auto-fixed
-        critical_js_patterns = [
-            (r'color\(([\'"]#[0-9a-fA-F]+[\'"]\))', "Use RGB values instead of hex codes"),
-            (r'\b(push|pop)\s*\(\s*\)', "Use pushMatrix()/popMatrix()"),
-            (r'createVector\s*\(', "Use 'new PVector()'"),
-        ]
-        
-        for pattern, error in critical_js_patterns:
-            if re.search(pattern, code):
+        for literal, pattern, error in _CRITICAL_JS_PATTERNS:
+            if literal in code and pattern.search(code):
                 self.log.error(f"Critical JavaScript syntax found: {error}")
                 return False
         
@@ -450,8 +546,7 @@ Return your code between these markers:
                 template = f.read()
             
             # Update renderPath in template using regex
-            template = re.sub(
-                r'String\s+renderPath\s*=\s*"renders/render_v\d+"',
+            template = _RENDER_PATH_RE.sub(
                 f'String renderPath = "renders/render_v{version}"',
                 template
             )
@@ -460,19 +555,17 @@ Return your code between these markers:
             start_marker = "// === USER'S CREATIVE CODE ==="
             end_marker = "// === SYSTEM FRAMEWORK ==="
             
-            parts = template.split(start_marker)
-            if len(parts) != 2:
+            # Each marker must appear exactly once
+            before_marker, found, rest = template.partition(start_marker)
+            if not found or start_marker in rest:
                 self.log.error("Could not find start marker in template")
                 return False
             
-            before_marker = parts[0]
-            parts = parts[1].split(end_marker)
-            if len(parts) != 2:
+            _, found, after_marker = rest.partition(end_marker)
+            if not found or end_marker in after_marker:
                 self.log.error("Could not find end marker in template")
                 return False
             
-            after_marker = parts[1]
-            
             # Combine with template, preserving the exact marker format
             full_code = (
                 before_marker + 
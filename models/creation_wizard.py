@@ -16,8 +16,8 @@ class CreationWizard:
         self.selected_colors = []  # Store selected color approaches
         self.selected_patterns = []  # Store selected pattern types
         
-    def collect_settings(self, model_name: str = None) -> dict:
-        """Collect all settings from the wizard"""
+    def collect_settings(self, model_name: str = None, num_artworks: int = None) -> dict:
+        """Collect all settings from the wizard; the artwork count is only asked when not given"""
         if model_name:
             self.selected_model = model_name
         else:
@@ -29,19 +29,17 @@ class CreationWizard:
         print("════════════════════════════════════════════════════════════════════════════════\n")
         
         # Ask for number of artworks to create
-        num_artworks = 1
-        while True:
+        while num_artworks is None:
             try:
                 print("\nHow many artworks would you like to create? (1-10)")
                 print("Press Enter for single artwork")
-                choice = input("> ").strip()
+                choice = self.menu_manager._prompt_choice("> ").strip()
                 if not choice:
-                    break
-                num = int(choice)
-                if 1 <= num <= 10:
-                    num_artworks = num
-                    break
-                print("Please enter a number between 1 and 10")
+                    num_artworks = 1
+                elif 1 <= int(choice) <= 10:
+                    num_artworks = int(choice)
+                else:
+                    print("Please enter a number between 1 and 10")
             except ValueError:
                 print("Please enter a valid number")
         
@@ -99,7 +97,7 @@ class CreationWizard:
         print("2. Flocking/Swarming")
         print("3. Particle Attraction")
         print("4. Rain/Snow simulation")
-        behavior = input("Choose particle behavior (1-4): ").strip()
+        behavior = self.menu_manager._prompt_choice("Choose particle behavior (1-4): ").strip()
         
         behaviors = {
             "1": "Create a galaxy-like system with stars orbiting a central point, using gravitational forces",
@@ -117,7 +115,7 @@ class CreationWizard:
         print("2. Tessellation")
         print("3. Fractal Growth")
         print("4. Shape Morphing")
-        geometry = input("Choose geometric style (1-4): ").strip()
+        geometry = self.menu_manager._prompt_choice("Choose geometric style (1-4): ").strip()
         
         geometries = {
             "1": "Transform between sacred geometry patterns (flower of life, metatron's cube, etc)",
@@ -135,7 +133,7 @@ class CreationWizard:
         print("2. Cellular Automata")
         print("3. Flow Fields")
         print("4. Wave Patterns")
-        pattern = input("Choose pattern type (1-4): ").strip()
+        pattern = self.menu_manager._prompt_choice("Choose pattern type (1-4): ").strip()
         
         # If no pattern selected, give minimal guidance and let AI be creative
         if not pattern:
@@ -165,11 +163,11 @@ class CreationWizard:
     def _handle_text_art(self) -> str:
         """Handle text art options"""
         print("\nWhat text would you like to create? (e.g. 'PRISM', 'Hello', etc.)")
-        desired_text = input().strip() or "PRISM"  # Default to PRISM if empty
+        desired_text = self.menu_manager._prompt_choice().strip() or "PRISM"  # Default to PRISM if empty
         
         print("\nWould you like to add any additional instructions? (e.g. 'only vertical motion', 'use specific colors', etc.)")
         print("Press Enter to skip")
-        extra_instructions = input("> ").strip()
+        extra_instructions = self.menu_manager._prompt_choice("> ").strip()
         
         print("\nText Art Options:")
         print("1. Particle Text")
@@ -177,7 +175,7 @@ class CreationWizard:
         print("3. Emergent Text")
         print("4. Morphing Text")
         print("\nEnter choice (1-4) or press Enter to let AI choose: ")
-        text_style = input().strip()
+        text_style = self.menu_manager._prompt_choice().strip()
         
         text_styles = {
             "1": f"Create text '{desired_text}' using dynamic particle systems that assemble and flow",
@@ -199,7 +197,7 @@ class CreationWizard:
             
         self.selected_illusions, categories = result
         if not self.selected_illusions:
-            cat_names = [self.menu_manager.illusion_types[c]['name'] for c in categories]
+            cat_names = [self.menu_manager.illusion_types[c].name for c in categories]
             guidelines = f"Create a dynamic optical illusion combining elements from the following categories: {', '.join(cat_names)}. "
             guidelines += "Choose the most effective techniques to create compelling visual effects. "
             guidelines += "Focus on strong perceptual impact and smooth execution."
@@ -215,7 +213,7 @@ class CreationWizard:
         """Add additional user guidelines to base guidelines"""
         print("\nWould you like to add any additional instructions? (e.g. specific colors, motion constraints, etc.)")
         print("Press Enter to skip")
-        additional = input("> ").strip()
+        additional = self.menu_manager._prompt_choice("> ").strip()
         if additional:
             return f"{base_guidelines}. Additional Requirements: {additional}"
         return base_guidelines
@@ -238,7 +236,7 @@ class CreationWizard:
         print("5. Claude 3 Opus")
         
         while True:
-            choice = input("\nEnter choice (1-5): ")
+            choice = self.menu_manager._prompt_choice("\nEnter choice (1-5): ")
             if choice in models:
                 self.selected_model = models[choice]
                 break
@@ -290,7 +288,7 @@ class CreationWizard:
         for i, style in enumerate(styles, 1):
             print(f"{i}. {style}")
             
-        choice = input("\nEnter selection: ").strip()
+        choice = self.menu_manager._prompt_choice("\nEnter selection: ").strip()
         if not choice:
             return ""
             
@@ -319,7 +317,7 @@ class CreationWizard:
         for i, shape in enumerate(shapes, 1):
             print(f"{i}. {shape}")
             
-        choice = input("\nEnter selection: ").strip()
+        choice = self.menu_manager._prompt_choice("\nEnter selection: ").strip()
         if not choice:
             return ""
             
@@ -348,7 +346,7 @@ class CreationWizard:
         for i, approach in enumerate(approaches, 1):
             print(f"{i}. {approach}")
             
-        choice = input("\nEnter selection: ").strip()
+        choice = self.menu_manager._prompt_choice("\nEnter selection: ").strip()
         if not choice:
             return ""
             
@@ -357,7 +355,7 @@ class CreationWizard:
             self.selected_colors = [approaches[i] for i in indices]
             selected_approach = random.choice(self.selected_colors)
             if selected_approach == "Custom color scheme":
-                custom = input("\nDescribe your custom color scheme (or press Enter to skip): ").strip()
+                custom = self.menu_manager._prompt_choice("\nDescribe your custom color scheme (or press Enter to skip): ").strip()
                 return custom if custom else ""
             return selected_approach
         return ""
@@ -381,7 +379,7 @@ class CreationWizard:
         for i, pattern in enumerate(patterns, 1):
             print(f"{i}. {pattern}")
             
-        choice = input("\nEnter selection: ").strip()
+        choice = self.menu_manager._prompt_choice("\nEnter selection: ").strip()
         if not choice:
             return ""
             
@@ -414,7 +412,7 @@ class CreationWizard:
             for i, technique in enumerate(techniques, 1):
                 print(f"{i}. {technique}")
             
-            choices = input(f"\nSelect {category} techniques: ").strip()
+            choices = self.menu_manager._prompt_choice(f"\nSelect {category} techniques: ").strip()
             if choices:
                 indices = self._parse_range_selection(choices, len(techniques))
                 selected = [techniques[i] for i in indices]
@@ -10,6 +10,9 @@ import subprocess
 import time
 import re
 
+# Text to render in guidelines such as: Create text 'PRISM'
+_GUIDELINE_TEXT_RE = re.compile(r"text '([^']+)'")
+
 class DynamicBuilder:
     def __init__(self, config: Config, log: ArtLogger, generator, db, menu_manager):
         self.config = config
@@ -40,11 +43,8 @@ class DynamicBuilder:
         # Get number of artworks to create
         num_artworks = settings.get('num_artworks', 1)
         
-        patterns = []
-        for i in range(num_artworks):
-            if num_artworks > 1:
-                self.log.info(f"\nCreating artwork {i+1} of {num_artworks}")
-            
+        prompts = []
+        for _ in range(num_artworks):
             # Build the creative prompt with randomly selected elements
             prompt = self._build_creative_prompt(
                 motion_style=random.choice(self.selected_motion_styles) if self.selected_motion_styles else "",
@@ -58,12 +58,27 @@ class DynamicBuilder:
             if "text" in settings.get('custom_guidelines', "").lower():
                 prompt["is_text_art"] = True
                 # Extract the text from the guidelines (assuming format like "Create text 'PRISM'")
-                text_match = re.search(r"text '([^']+)'", settings['custom_guidelines'])
+                text_match = _GUIDELINE_TEXT_RE.search(settings['custom_guidelines'])
                 if text_match:
                     prompt["text"] = text_match.group(1)
+            prompts.append(prompt)
+        
+        # 4o can return several sketches from one request and o1 can run the pieces
+        # concurrently, so fetch them up front
+        if self.selected_model == '4o' and num_artworks > 1:
+            pieces = self._pregenerate_o4(prompts)
+        elif self.selected_model in ['o1', 'o1-mini'] and num_artworks > 1:
+            pieces = self._pregenerate_o1(prompts)
+        else:
+            pieces = [(prompt, None) for prompt in prompts]
+        
+        patterns = []
+        for i, (prompt, pregenerated_code) in enumerate(pieces):
+            if num_artworks > 1:
+                self.log.info(f"\nCreating artwork {i+1} of {num_artworks}")
             
             # Generate the artwork
-            pattern = self._generate_artwork(prompt)
+            pattern = self._generate_artwork(prompt, pregenerated_code)
             if pattern:
                 patterns.append(pattern)
             else:
@@ -72,6 +87,97 @@ class DynamicBuilder:
         # Return the last pattern for backward compatibility
         return patterns[-1] if patterns else None
     
+    def _pregenerate_o4(self, prompts: List[dict]) -> List[tuple]:
+        """Fetch 4o sketches for every piece up front.
+        
+        Returns (prompt, code or None) per piece. Each piece's attempt options
+        are chosen here, and a piece that got a sketch keeps the options it was
+        built from; the others keep their original prompt for the normal path.
+        """
+        pieces = self._first_attempt_pieces(prompts)
+        texts = [self._o4_prompt_text(piece) for piece in pieces]
+        
+        if len(set(texts)) == 1:
+            # Identical prompts: one request for n completions
+            batch = self.generator.o4_generator.generate_batch(texts[0], len(texts))
+            codes = batch + [None] * (len(texts) - len(batch))
+        else:
+            # Distinct prompts: one request answering each under its own header
+            codes = self.generator.o4_generator.generate_prompt_batch(texts)
+        
+        # Top up rejected sketches with concurrent single requests for the same prompts
+        missing = [i for i, code in enumerate(codes) if not code]
+        if missing:
+            extra = self.generator.o4_generator.generate_concurrent([texts[i] for i in missing])
+            for i, code in zip(missing, extra):
+                codes[i] = code
+        
+        return self._pair_pregenerated(prompts, pieces, codes)
+
+    def _pregenerate_o1(self, prompts: List[dict]) -> List[tuple]:
+        """Generate o1 sketches for every piece concurrently; same result shape as _pregenerate_o4"""
+        generator = self.generator.o1_generator
+        generator.current_model = self.selected_model
+        pieces = self._first_attempt_pieces(prompts)
+        codes = generator.generate_concurrent(
+            [generator.build_code_prompt(piece, piece.get("custom_guidelines")) for piece in pieces],
+            skip_generation_prompt=True
+        )
+        return self._pair_pregenerated(prompts, pieces, codes)
+
+    def _first_attempt_pieces(self, prompts: List[dict]) -> List[dict]:
+        """Copies of the piece prompts with their first-attempt options chosen"""
+        pieces = []
+        for prompt in prompts:
+            piece = dict(prompt)
+            self._apply_attempt_options(piece)
+            pieces.append(piece)
+        return pieces
+
+    @staticmethod
+    def _pair_pregenerated(prompts: List[dict], pieces: List[dict], codes: List[Optional[str]]) -> List[tuple]:
+        """(prompt, code) per piece: the options a sketch was built from, or the untouched prompt without one"""
+        return [(piece, code) if code else (prompt, None)
+                for prompt, piece, code in zip(prompts, pieces, codes)]
+
+    def _o4_prompt_text(self, prompt_data: dict) -> str:
+        """Creative direction for the 4o generator, which takes a single prompt string"""
+        lines = [", ".join(prompt_data.get("techniques", []))]
+        for key, label in (("motion_style", "Motion Style"), ("shape_elements", "Shape Elements"),
+                           ("color_approach", "Color Approach"), ("pattern_type", "Pattern Type")):
+            if prompt_data.get(key):
+                lines.append(f"• {label}: {prompt_data[key]}")
+        if prompt_data.get("custom_guidelines"):
+            lines.append(f"\n=== CUSTOM REQUIREMENTS ===\n{prompt_data['custom_guidelines']}")
+        return "\n".join(lines)
+
+    def _apply_attempt_options(self, prompt_data: dict):
+        """Randomly select new illusion and style options for a generation attempt"""
+        if self.selected_illusions:
+            _, chosen_illusion = random.choice(self.selected_illusions)
+            illusion_guidelines = f"Create a dynamic optical illusion using the {chosen_illusion.lower()} technique. "
+            illusion_guidelines += "Focus on creating a strong visual effect that challenges perception. "
+            illusion_guidelines += "Ensure the illusion is clear and effective, with smooth transitions and proper timing for maximum impact."
+            
+            # Preserve existing custom guidelines if they exist
+            existing_guidelines = prompt_data.get("custom_guidelines", "")
+            if existing_guidelines:
+                prompt_data["custom_guidelines"] = f"{existing_guidelines}. {illusion_guidelines}"
+            else:
+                prompt_data["custom_guidelines"] = illusion_guidelines
+        
+        if self.selected_motion_styles:
+            prompt_data["motion_style"] = random.choice(self.selected_motion_styles)
+        
+        if self.selected_shapes:
+            prompt_data["shape_elements"] = random.choice(self.selected_shapes)
+        
+        if self.selected_colors:
+            prompt_data["color_approach"] = random.choice(self.selected_colors)
+        
+        if self.selected_patterns:
+            prompt_data["pattern_type"] = random.choice(self.selected_patterns)
+
     def _build_creative_prompt(self, motion_style: str = "", shape_elements: str = "", color_approach: str = "", pattern_type: str = "", custom_guidelines: str = "") -> dict:
         """Build the creative prompt from selected options"""
         # Start with base prompt structure
@@ -90,15 +196,15 @@ class DynamicBuilder:
             # If this is text art, add text-specific information
             if "text" in custom_guidelines.lower():
                 # Extract the text from the guidelines (assuming format like "Create text 'PRISM'")
-                text_match = re.search(r"text '([^']+)'", custom_guidelines)
+                text_match = _GUIDELINE_TEXT_RE.search(custom_guidelines)
                 if text_match:
                     prompt["text"] = text_match.group(1)
                     prompt["is_text_art"] = True
             
         return prompt
     
-    def _generate_artwork(self, prompt_data: dict) -> Optional[Pattern]:
-        """Generate the artwork using the built prompt"""
+    def _generate_artwork(self, prompt_data: dict, pregenerated_code: Optional[str] = None) -> Optional[Pattern]:
+        """Generate the artwork using the built prompt, or pre-generated code on the first attempt"""
         try:
             # Get next version
             next_version = self.config.get_next_version()
@@ -134,38 +240,23 @@ class DynamicBuilder:
                             if "custom_guidelines" in prompt_data:
                                 prompt_data["custom_guidelines"] = "IMPORTANT: Follow exact letterMask initialization sequence. " + prompt_data["custom_guidelines"]
                 
-                # Randomly select new options for each attempt
-                if self.selected_illusions:
-                    _, chosen_illusion = random.choice(self.selected_illusions)
-                    illusion_guidelines = f"Create a dynamic optical illusion using the {chosen_illusion.lower()} technique. "
-                    illusion_guidelines += "Focus on creating a strong visual effect that challenges perception. "
-                    illusion_guidelines += "Ensure the illusion is clear and effective, with smooth transitions and proper timing for maximum impact."
-                    
-                    # Preserve existing custom guidelines if they exist
-                    existing_guidelines = prompt_data.get("custom_guidelines", "")
-                    if existing_guidelines:
-                        prompt_data["custom_guidelines"] = f"{existing_guidelines}. {illusion_guidelines}"
-                    else:
-                        prompt_data["custom_guidelines"] = illusion_guidelines
-                
-                if self.selected_motion_styles:
-                    prompt_data["motion_style"] = random.choice(self.selected_motion_styles)
-                
-                if self.selected_shapes:
-                    prompt_data["shape_elements"] = random.choice(self.selected_shapes)
-                
-                if self.selected_colors:
-                    prompt_data["color_approach"] = random.choice(self.selected_colors)
-                
-                if self.selected_patterns:
-                    prompt_data["pattern_type"] = random.choice(self.selected_patterns)
+                # Randomly select new options for each attempt; pre-generated code
+                # was built from options already chosen for it
+                if not (attempt == 0 and pregenerated_code):
+                    self._apply_attempt_options(prompt_data)
                 
                 # Get custom guidelines if they exist
                 custom_guidelines = prompt_data.get("custom_guidelines", None)
                 
                 try:
                     # Generate the code with retry count and last error
-                    code = generator.generate_code(prompt_data, custom_guidelines=custom_guidelines, retry_count=attempt)
+                    if attempt == 0 and pregenerated_code:
+                        code = pregenerated_code
+                    elif self.selected_model == '4o':
+                        # 4o takes a single prompt string rather than wizard prompt data
+                        code = generator.generate_with_ai(self._o4_prompt_text(prompt_data))
+                    else:
+                        code = generator.generate_code(prompt_data, custom_guidelines=custom_guidelines, retry_count=attempt)
                     
                     if not code:
                         if attempt < max_retries - 1:
@@ -180,7 +271,7 @@ class DynamicBuilder:
                             continue
                     
                     # Build the template
-                    final_code = generator.build_processing_template(code, next_version)
+                    final_code = self.generator.validator.build_processing_template(code, next_version)
                     
                     # Save the code
                     with open(self.config.paths['template'], 'w') as f:
@@ -1,16 +1,157 @@
 from logger import ArtLogger
 from config import Config
-from models.flux import FluxGenerator
-from models.dynamic_builder import DynamicBuilder
 from models.creation_wizard import CreationWizard
+from collections import namedtuple
+from types import MappingProxyType
+import re
+import os
+import sys
+
+# Matches one "n" or "start-end" entry of a comma-separated range selection
+_RANGE_TOKEN_RE = re.compile(r'(?:^|,)\s*(\d+)\s*(?:-\s*(\d+)\s*)?(?=,|$)')
+
+# Keywords that mark custom guidelines as a text-art requirement (substring match)
+_TEXT_REQ_RE = re.compile(r'text|spell|word|letter', re.IGNORECASE)
+
+# Illusion categories are static, so they are built once at import time
+_Illusion = namedtuple('Illusion', 'name options')
+
+
+def _illusion_options(*labels):
+    """Pair each display label with its short name (label minus the parenthetical)"""
+    return tuple((label, label.split(" (")[0]) for label in labels)
+
+
+_ILLUSION_TYPES = MappingProxyType({
+    "1": _Illusion("Motion Illusions", _illusion_options(
+        "Spinning Spiral (hypnotic rotation effect)",
+        "Peripheral Drift (subtle motion in periphery)",
+        "Motion Aftereffect (waterfall illusion)",
+        "Rotating Snakes (illusory rotation)",
+    )),
+    "2": _Illusion("Geometric Illusions", _illusion_options(
+        "Impossible Shapes (paradoxical structures)",
+        "Cafe Wall (parallel lines appear sloped)",
+        "Penrose Triangle (impossible triangle)",
+        "Necker Cube (ambiguous perspective)",
+    )),
+    "3": _Illusion("Color Illusions", _illusion_options(
+        "Simultaneous Contrast (color perception changes)",
+        "Color Afterimage (complementary color effect)",
+        "Chromatic Aberration (color splitting)",
+        "Bezold Effect (color spreading)",
+    )),
+    "4": _Illusion("Cognitive Illusions", _illusion_options(
+        "Ambiguous Figures (multiple interpretations)",
+        "Hidden Patterns (emergent images)",
+        "Gestalt Patterns (whole vs parts)",
+        "Anamorphic Art (perspective-dependent)",
+    )),
+})
+
+# Static menu text, rendered once at import so each redraw is a single write
+_BORDER = "════════════════════════════════════════════════════════════════════════════════"
+
+_MAIN_MENU = "\n".join((
+    "\n" + _BORDER,
+    "║ P.R.I.S.M. STUDIO",
+    _BORDER + "\n",
+    "1. Create Art",
+    "2. Clean Studio",
+    "3. Toggle Debug Mode",
+    "4. Variation Mode",
+    "5. Exit",
+))
+
+_MODEL_MENU = "\n".join((
+    "\nAvailable Models:",
+    "1. O1",
+    "2. O1-mini",
+    "3. 4O",
+    "4. Claude 3.5 Sonnet",
+    "5. Claude 3 Opus",
+    "6. Flux (Static artwork)",
+    "7. Back to Main Menu",
+))
+
+_CREATION_MODE_MENU = "\n".join((
+    "\nCreation Mode:",
+    "1. Guided Creation (Wizard)",
+    "2. Automated Evolution",
+    "3. Back to Model Selection",
+    "4. Back to Main Menu",
+))
+
+_WIZARD_MODE_MENU = "\n".join((
+    "\nSelect Mode:",
+    "1. Standard Mode (Direct Creation)",
+    "2. Refinement Mode (Iterative Creation)",
+    "3. Back to Creation Mode",
+))
+
+_STANDARD_MODE_MENU = "\n".join((
+    "\nCreation Options:",
+    "1. Create Single Piece",
+    "2. Create Multiple Pieces",
+    "3. Back to Wizard Mode",
+))
+
+_REFINEMENT_MENU = "\n".join((
+    "\nRefinement Options:",
+    "1. Keep this version",
+    "2. Modify and try again",
+    "3. Start over",
+    "4. Back to Wizard Mode",
+))
+
+_GENERATION_MENU = "\n".join((
+    "\nCreation Mode:",
+    "1. Single Creation",
+    "2. Multiple Pieces",
+    "3. Continuous Studio",
+    "4. Back to Creation Mode",
+    "5. Back to Model Selection",
+    "6. Back to Main Menu",
+))
+
+_ILLUSION_CATEGORY_MENU = "\n".join((
+    "\nOptical Illusion Categories:",
+    "1. Motion Illusions (spinning, drifting effects)",
+    "2. Geometric Illusions (impossible shapes)",
+    "3. Color Illusions (contrast, afterimages)",
+    "4. Cognitive Illusions (ambiguous figures)",
+    "\nFormat: single number, list (1,2,3), range (1-3), 'all', or Enter to skip",
+))
+
+_CREATIVE_MODE_MENU = "\n".join((
+    "\nChoose Creative Mode:",
+    "1. Particle Systems (physics-based animations)",
+    "2. Geometric Transformations (shape morphing)",
+    "3. Pattern Generation (recursive/emergent)",
+    "4. Text Art (shape-based/organic)",
+    "5. Optical Illusions & Visual Puzzles",
+    "6. Custom Guidelines",
+    "\nEnter choice (1-6) or press Enter to skip: ",
+))
 
 class MenuManager:
+    # Model selection menu choices
+    _MODEL_MAP = MappingProxyType({
+        "1": "o1",
+        "2": "o1-mini",
+        "3": "4o",
+        "4": "claude-3.5-sonnet",
+        "5": "claude-3-opus",
+        "6": "flux"
+    })
+
     def __init__(self, config: Config, log: ArtLogger, prism_instance):
         self.config = config
         self.log = log
         self.prism = prism_instance
         self.selected_model = None
         # Initialize DynamicBuilder with required dependencies
+        from models.dynamic_builder import DynamicBuilder
         self.dynamic_builder = DynamicBuilder(
             config=self.config,
             log=self.log,
@@ -18,116 +159,82 @@ class MenuManager:
             db=self.prism.db,
             menu_manager=self
         )
-        self.illusion_types = {
-            "1": {
-                "name": "Motion Illusions",
-                "options": [
-                    "Spinning Spiral (hypnotic rotation effect)",
-                    "Peripheral Drift (subtle motion in periphery)",
-                    "Motion Aftereffect (waterfall illusion)",
-                    "Rotating Snakes (illusory rotation)",
-                ]
-            },
-            "2": {
-                "name": "Geometric Illusions",
-                "options": [
-                    "Impossible Shapes (paradoxical structures)",
-                    "Cafe Wall (parallel lines appear sloped)",
-                    "Penrose Triangle (impossible triangle)",
-                    "Necker Cube (ambiguous perspective)",
-                ]
-            },
-            "3": {
-                "name": "Color Illusions",
-                "options": [
-                    "Simultaneous Contrast (color perception changes)",
-                    "Color Afterimage (complementary color effect)",
-                    "Chromatic Aberration (color splitting)",
-                    "Bezold Effect (color spreading)",
-                ]
-            },
-            "4": {
-                "name": "Cognitive Illusions",
-                "options": [
-                    "Ambiguous Figures (multiple interpretations)",
-                    "Hidden Patterns (emergent images)",
-                    "Gestalt Patterns (whole vs parts)",
-                    "Anamorphic Art (perspective-dependent)",
-                ]
-            }
+        self.illusion_types = _ILLUSION_TYPES
+        
+        # Decorative menus are skipped when output is piped; automated runs then
+        # script every answer through PRISM_MENU_CHOICES (e.g. "1,3,2")
+        self._tty = sys.stdout.isatty()
+        self._scripted_choices = []
+        if not self._tty:
+            # Empty entries stand for pressing Enter at a prompt with a default
+            choices = os.getenv('PRISM_MENU_CHOICES', '')
+            self._scripted_choices = [c.strip() for c in choices.split(',')] if choices.strip() else []
+        
+        # Menu dispatch tables - a handler returning True leaves its menu loop
+        self._main_actions = {
+            "1": self._create_art,
+            "2": self.prism.cleanup_system,
+            "3": self._toggle_debug,
+            "4": self._open_variation_mode,
+            "5": self._exit_studio,
+        }
+        self._animated_actions = {
+            "1": self._open_wizard_mode,
+            "2": self._open_generation_menu,
+            "3": self._back_to_model_selection,
+            "4": self._leave_menu,
+        }
+        self._wizard_actions = {
+            "1": self._open_standard_mode,
+            "2": self._open_refinement_mode,
+            "3": self._leave_menu,
+        }
+        self._standard_actions = {
+            "1": self._create_single_piece,
+            "2": self._create_multiple_pieces,
+            "3": self._leave_menu,
+        }
+        self._generation_actions = {
+            "1": self._run_single_creation,
+            "2": self._run_multiple_creations,
+            "3": self._run_continuous_studio,
+            "4": self._back_to_creation_mode,
+            "5": self._back_to_model_selection,
+            "6": self._leave_menu,
         }
         
     def show_menu(self):
         """Show the main menu and handle user input"""
         while True:
-            print("\n════════════════════════════════════════════════════════════════════════════════")
-            print("║ P.R.I.S.M. STUDIO")
-            print("════════════════════════════════════════════════════════════════════════════════\n")
-            print("1. Create Art")
-            print("2. Clean Studio")
-            print("3. Toggle Debug Mode")
-            print("4. Variation Mode")
-            print("5. Exit")
+            self._show_menu_text(_MAIN_MENU)
             
-            choice = input("\nEnter your choice (1-5): ").strip()
+            choice = self._prompt_choice("\nEnter your choice (1-5): ").strip()
             
-            if choice == "1":
-                # Initialize the creation wizard
-                wizard = CreationWizard(self.config, self.log, self)
-                settings = wizard.collect_settings()
-                if settings:
-                    self.dynamic_builder.create_artwork(settings)
-            elif choice == "2":
-                self.prism.cleanup_system()
-            elif choice == "3":
-                debug_enabled = self.config.toggle_debug_mode()
-                self.log.set_debug(debug_enabled)
-                if hasattr(self.prism, 'generator'):
-                    self.prism.generator.log.set_debug(debug_enabled)
-            elif choice == "4":
-                if hasattr(self.prism, 'variation_manager'):
-                    self.prism.variation_manager.show_variation_flow()
-                else:
-                    print("\nVariation manager not initialized")
-            elif choice == "5":
-                print("\nExiting P.R.I.S.M. Studio...")
-                break
-            else:
+            action = self._main_actions.get(choice)
+            if action is None:
                 print("\nInvalid choice. Please try again.")
+            elif action():
+                break
     
     def show_creation_flow(self):
         """Show streamlined creation flow"""
         self.log.title("SELECT CREATIVE MODEL")
-        print("\nAvailable Models:")
-        print("1. O1")
-        print("2. O1-mini")
-        print("3. 4O")
-        print("4. Claude 3.5 Sonnet")
-        print("5. Claude 3 Opus")
-        print("6. Flux (Static artwork)")
-        print("7. Back to Main Menu")
+        self._show_menu_text(_MODEL_MENU)
         
-        choice = input("\nEnter your choice (1-7): ")
+        choice = self._prompt_choice("\nEnter your choice (1-7): ")
         
         if choice == "7":
             return
             
-        model_map = {
-            "1": "o1",
-            "2": "o1-mini",
-            "3": "4o",
-            "4": "claude-3.5-sonnet",
-            "5": "claude-3-opus",
-            "6": "flux"
-        }
-        
-        if choice in model_map:
-            self.selected_model = model_map[choice]
+        if choice in self._MODEL_MAP:
+            self.selected_model = self._MODEL_MAP[choice]
             self.config.model_config['model_selection'] = self.selected_model
             
             # Initialize Flux generator if selected
             if self.selected_model == "flux":
                 if self.prism.flux_generator is None:
+                    # Flux pulls in heavy dependencies, so only import it when chosen
+                    from models.flux import FluxGenerator
                     self.prism.flux_generator = FluxGenerator(self.config, self.log)
                 self.show_flux_menu()
             else:
@@ -140,102 +247,49 @@ class MenuManager:
         while True:
             self.log.title("CREATION MODE")
             current_model = self.config.model_config['model_selection']
-            print(f"\nCurrent Model: {current_model}")
-            
-            print("\nCreation Mode:")
-            print("1. Guided Creation (Wizard)")
-            print("2. Automated Evolution")
-            print("3. Back to Model Selection")
-            print("4. Back to Main Menu")
+            self._show_menu_text(f"\nCurrent Model: {current_model}\n{_CREATION_MODE_MENU}")
             
-            choice = input("\nEnter your choice (1-4): ")
+            choice = self._prompt_choice("\nEnter your choice (1-4): ")
             
-            if choice == "1":  # Wizard Mode
-                self.show_wizard_mode_menu(current_model)
-                input("\nPress Enter to continue...")
-            elif choice == "2":  # Automated Evolution
-                self.show_generation_menu()
-            elif choice == "3":
-                self.show_creation_flow()
-                break
-            elif choice == "4":
-                break
-            else:
+            action = self._animated_actions.get(choice)
+            if action is None:
                 print("\nInvalid choice. Please try again.")
+            elif action(current_model):
+                break
     
     def show_wizard_mode_menu(self, current_model):
         """Show wizard mode selection menu"""
         while True:
             self.log.title("WIZARD MODE")
-            print(f"\nCurrent Model: {current_model}")
-            
-            print("\nSelect Mode:")
-            print("1. Standard Mode (Direct Creation)")
-            print("2. Refinement Mode (Iterative Creation)")
-            print("3. Back to Creation Mode")
+            self._show_menu_text(f"\nCurrent Model: {current_model}\n{_WIZARD_MODE_MENU}")
             
-            choice = input("\nEnter your choice (1-3): ")
+            choice = self._prompt_choice("\nEnter your choice (1-3): ")
             
-            if choice == "1":  # Standard Mode
-                self.show_standard_mode(current_model)
-                break
-            elif choice == "2":  # Refinement Mode
-                self.show_refinement_mode(current_model)
-                break
-            elif choice == "3":
-                break
-            else:
+            action = self._wizard_actions.get(choice)
+            if action is None:
                 print("\nInvalid choice. Please try again.")
+            elif action(current_model):
+                break
 
     def show_standard_mode(self, current_model):
         """Show standard mode interface with batch creation option"""
         while True:
             self.log.title("STANDARD MODE")
-            print(f"\nCurrent Model: {current_model}")
+            self._show_menu_text(f"\nCurrent Model: {current_model}\n{_STANDARD_MODE_MENU}")
             
-            print("\nCreation Options:")
-            print("1. Create Single Piece")
-            print("2. Create Multiple Pieces")
-            print("3. Back to Wizard Mode")
+            choice = self._prompt_choice("\nEnter your choice (1-3): ")
             
-            choice = input("\nEnter your choice (1-3): ")
-            
-            if choice == "1":  # Single piece
-                pattern = self.dynamic_builder.show_creation_wizard(model_name=current_model)
-                if pattern:
-                    self.log.success("Pattern created successfully")
-                break
-            elif choice == "2":  # Multiple pieces
-                try:
-                    count = int(input("\nHow many pieces would you like to create? (1-10): "))
-                    if 1 <= count <= 10:
-                        # Get settings once and store them
-                        self.log.info(f"\nSetting up creation parameters for {count} pieces...")
-                        settings = self.dynamic_builder.get_creation_settings(model_name=current_model)
-                        
-                        # Use stored settings for each piece
-                        for i in range(count):
-                            self.log.info(f"\nCreating piece {i+1} of {count}")
-                            pattern = self.dynamic_builder.create_with_settings(settings)
-                            if pattern:
-                                self.log.success(f"Pattern {i+1} created successfully")
-                            else:
-                                self.log.error(f"Failed to create pattern {i+1}")
-                        break
-                    else:
-                        print("Please enter a number between 1 and 10")
-                except ValueError:
-                    print("Please enter a valid number")
-            elif choice == "3":
-                break
-            else:
+            action = self._standard_actions.get(choice)
+            if action is None:
                 print("\nInvalid choice. Please try again.")
+            elif action(current_model):
+                break
 
     def show_refinement_mode(self, current_model):
         """Show refinement mode interface"""
         while True:
             self.log.title("REFINEMENT MODE")
-            print(f"\nCurrent Model: {current_model}")
+            self._show_menu_text(f"\nCurrent Model: {current_model}")
             
             # Create initial piece
             pattern = self.dynamic_builder.show_creation_wizard(model_name=current_model)
@@ -244,13 +298,9 @@ class MenuManager:
                 break
                 
             while True:
-                print("\nRefinement Options:")
-                print("1. Keep this version")
-                print("2. Modify and try again")
-                print("3. Start over")
-                print("4. Back to Wizard Mode")
+                self._show_menu_text(_REFINEMENT_MENU)
                 
-                choice = input("\nEnter your choice (1-4): ")
+                choice = self._prompt_choice("\nEnter your choice (1-4): ")
                 
                 if choice == "1":  # Keep version
                     self.log.success("Pattern saved successfully")
@@ -273,51 +323,165 @@ class MenuManager:
         """Show automated generation options menu"""
         while True:
             self.log.title("AUTOMATED EVOLUTION")
-            print("\nCreation Mode:")
-            print("1. Single Creation")
-            print("2. Multiple Pieces")
-            print("3. Continuous Studio")
-            print("4. Back to Creation Mode")
-            print("5. Back to Model Selection")
-            print("6. Back to Main Menu")
-            
             current_model = self.config.model_config['model_selection']
-            print(f"\nCurrent Model: {current_model}")
+            self._show_menu_text(f"{_GENERATION_MENU}\n\nCurrent Model: {current_model}")
             
-            choice = input("\nEnter your choice (1-6): ")
+            choice = self._prompt_choice("\nEnter your choice (1-6): ")
             
-            if choice == "1":
-                self.prism.run_iteration()
-                input("\nPress Enter to continue...")
-            elif choice == "2":
-                try:
-                    count = int(input("How many pieces to create? "))
-                    if count > 0:
-                        for i in range(count):
-                            self.log.info(f"\nCreating piece {i+1} of {count}")
-                            self.prism.run_iteration()
-                        input("\nCreation complete. Press Enter to continue...")
-                except ValueError:
-                    print("Please enter a valid number")
-            elif choice == "3":
-                try:
-                    interval = int(input("Enter interval between creations in seconds: "))
-                    if interval <= 0:
-                        print("Interval must be greater than 0 seconds")
-                        continue
-                    self.prism.run_continuous(interval)
-                except ValueError:
-                    print("Please enter a valid number")
-            elif choice == "4":
-                self.show_animated_model_menu()
-                break
-            elif choice == "5":
-                self.show_creation_flow()
-                break
-            elif choice == "6":
-                break
-            else:
+            action = self._generation_actions.get(choice)
+            if action is None:
                 print("\nInvalid choice. Please try again.")
+            elif action():
+                break
+
+    def _show_menu_text(self, text: str):
+        """Print menu text, skipping it when stdout is not a terminal"""
+        if self._tty:
+            print(text)
+
+    def _prompt_choice(self, prompt: str = "") -> str:
+        """Read one answer, taking scripted choices first when stdout is not a terminal.
+        
+        Off a terminal there is nobody to type, so running out of scripted
+        choices fails fast instead of blocking on input().
+        """
+        if self._scripted_choices:
+            return self._scripted_choices.pop(0)
+        if not self._tty:
+            raise EOFError(f"No scripted answer left for {prompt.strip() or 'menu input'!r}; "
+                           "add it to PRISM_MENU_CHOICES")
+        return input(prompt)
+
+    def _pause(self, prompt: str = "\nPress Enter to continue..."):
+        """Wait for Enter on a terminal; automated runs carry straight on"""
+        if self._tty:
+            input(prompt)
+
+    def _leave_menu(self, current_model=None) -> bool:
+        """Menu action that returns to the previous menu"""
+        return True
+
+    # Main menu actions
+    def _create_art(self):
+        """Run the creation wizard and build artwork from its settings"""
+        wizard = CreationWizard(self.config, self.log, self)
+        settings = wizard.collect_settings()
+        if settings:
+            self.dynamic_builder.create_artwork(settings)
+
+    def _toggle_debug(self):
+        """Toggle debug logging for the studio and generator"""
+        debug_enabled = self.config.toggle_debug_mode()
+        self.log.set_debug(debug_enabled)
+        if hasattr(self.prism, 'generator'):
+            self.prism.generator.log.set_debug(debug_enabled)
+
+    def _open_variation_mode(self):
+        """Open the variation flow if the variation manager is available"""
+        if hasattr(self.prism, 'variation_manager'):
+            self.prism.variation_manager.show_variation_flow()
+        else:
+            print("\nVariation manager not initialized")
+
+    def _exit_studio(self) -> bool:
+        """Leave the main menu"""
+        print("\nExiting P.R.I.S.M. Studio...")
+        return True
+
+    # Creation mode actions
+    def _open_wizard_mode(self, current_model) -> bool:
+        """Open wizard mode, then pause before redrawing the creation menu"""
+        self.show_wizard_mode_menu(current_model)
+        self._pause()
+        return False
+
+    def _open_generation_menu(self, current_model) -> bool:
+        """Open the automated evolution menu"""
+        self.show_generation_menu()
+        return False
+
+    def _back_to_model_selection(self, current_model=None) -> bool:
+        """Return to model selection, closing the current menu"""
+        self.show_creation_flow()
+        return True
+
+    def _back_to_creation_mode(self) -> bool:
+        """Return to the creation mode menu, closing the current menu"""
+        self.show_animated_model_menu()
+        return True
+
+    # Wizard mode actions
+    def _open_standard_mode(self, current_model) -> bool:
+        """Open standard mode and close the wizard menu afterwards"""
+        self.show_standard_mode(current_model)
+        return True
+
+    def _open_refinement_mode(self, current_model) -> bool:
+        """Open refinement mode and close the wizard menu afterwards"""
+        self.show_refinement_mode(current_model)
+        return True
+
+    # Standard mode actions
+    def _create_single_piece(self, current_model) -> bool:
+        """Create one piece through the creation wizard"""
+        pattern = self.dynamic_builder.show_creation_wizard(model_name=current_model)
+        if pattern:
+            self.log.success("Pattern created successfully")
+        return True
+
+    def _create_multiple_pieces(self, current_model) -> bool:
+        """Create a batch of pieces that share one set of settings"""
+        try:
+            count = int(self._prompt_choice("\nHow many pieces would you like to create? (1-10): "))
+        except ValueError:
+            print("Please enter a valid number")
+            return False
+        
+        if not 1 <= count <= 10:
+            print("Please enter a number between 1 and 10")
+            return False
+        
+        # Get settings once and store them
+        self.log.info(f"\nSetting up creation parameters for {count} pieces...")
+        wizard = CreationWizard(self.config, self.log, self)
+        settings = wizard.collect_settings(model_name=current_model, num_artworks=count)
+        
+        # Create all pieces in one pass so supported models can batch the API call
+        pattern = self.dynamic_builder.create_artwork(settings)
+        if pattern:
+            self.log.success(f"Created {count} pieces")
+        else:
+            self.log.error("Failed to create pieces")
+        return True
+
+    # Automated evolution actions
+    def _run_single_creation(self):
+        """Run one automated iteration"""
+        self.prism.run_iteration()
+        self._pause()
+
+    def _run_multiple_creations(self):
+        """Run a user-chosen number of automated iterations"""
+        try:
+            count = int(self._prompt_choice("How many pieces to create? "))
+            if count > 0:
+                for i in range(count):
+                    self.log.info(f"\nCreating piece {i+1} of {count}")
+                    self.prism.run_iteration()
+                self._pause("\nCreation complete. Press Enter to continue...")
+        except ValueError:
+            print("Please enter a valid number")
+
+    def _run_continuous_studio(self):
+        """Run automated iterations continuously at a user-chosen interval"""
+        try:
+            interval = int(self._prompt_choice("Enter interval between creations in seconds: "))
+            if interval <= 0:
+                print("Interval must be greater than 0 seconds")
+                return
+            self.prism.run_continuous(interval)
+        except ValueError:
+            print("Please enter a valid number")
 
     def _build_creative_prompt(self, motion: str, shapes: str, colors: str, pattern: str, custom_guidelines: str = "") -> dict:
         """Build the creative prompt from selected options"""
@@ -331,7 +495,7 @@ class MenuManager:
         
         if custom_guidelines:
             # Check if this is a text-based requirement
-            is_text_requirement = any(word in custom_guidelines.lower() for word in ['text', 'spell', 'word', 'letter'])
+            is_text_requirement = bool(_TEXT_REQ_RE.search(custom_guidelines))
             
             if is_text_requirement:
                 # Enhance the guideline to be more specific about shape-based approach
@@ -352,38 +516,21 @@ class MenuManager:
         if not selection.strip() or selection.lower() == "all":
             return list(range(max_value))
             
-        selected = set()
-        parts = selection.split(",")
-        
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-                
-            try:
-                if "-" in part:
-                    start, end = map(int, part.split("-"))
-                    if 1 <= start <= end <= max_value:
-                        selected.update(range(start-1, end))
-                else:
-                    num = int(part)
-                    if 1 <= num <= max_value:
-                        selected.add(num-1)
-            except ValueError:
-                continue
+        # Each match is a comma-delimited "n" or "start-end" token; anything else is skipped
+        selected = 0
+        for match in _RANGE_TOKEN_RE.finditer(selection):
+            start = int(match.group(1))
+            end = int(match.group(2) or start)
+            if 1 <= start <= end <= max_value:
+                selected |= ((1 << (end - start + 1)) - 1) << (start - 1)
                 
-        return sorted(list(selected))
+        return [i for i in range(max_value) if selected >> i & 1]
 
     def _get_illusion_choices(self):
         """Get user's illusion choices"""
-        print("\nOptical Illusion Categories:")
-        print("1. Motion Illusions (spinning, drifting effects)")
-        print("2. Geometric Illusions (impossible shapes)")
-        print("3. Color Illusions (contrast, afterimages)")
-        print("4. Cognitive Illusions (ambiguous figures)")
-        print("\nFormat: single number, list (1,2,3), range (1-3), 'all', or Enter to skip")
+        print(_ILLUSION_CATEGORY_MENU)
         
-        illusion_type = input("\nChoose illusion categories: ").strip()
+        illusion_type = self._prompt_choice("\nChoose illusion categories: ").strip()
         
         if not illusion_type:
             return None
@@ -399,45 +546,38 @@ class MenuManager:
         for cat_num in categories:
             if cat_num in self.illusion_types:
                 category = self.illusion_types[cat_num]
-                print(f"\n{category['name']} Options:")
-                for i, option in enumerate(category['options'], 1):
-                    print(f"{i}. {option}")
+                print(f"\n{category.name} Options:")
+                for i, (display, _) in enumerate(category.options, 1):
+                    print(f"{i}. {display}")
                 
-                specific_choice = input(f"\nChoose specific {category['name'].lower()} (same format as above): ").strip()
+                specific_choice = self._prompt_choice(f"\nChoose specific {category.name.lower()} (same format as above): ").strip()
                 
                 if specific_choice:
-                    sub_indices = self._parse_range_selection(specific_choice, len(category['options']))
+                    sub_indices = self._parse_range_selection(specific_choice, len(category.options))
                     if sub_indices:
                         for idx in sub_indices:
-                            illusion = category['options'][idx].split(" (")[0]
-                            selected_illusions.append((category['name'], illusion))
+                            illusion = category.options[idx][1]
+                            selected_illusions.append((category.name, illusion))
         
         return selected_illusions, categories
 
     def _get_creative_mode(self):
         """Get creative mode choice from user"""
-        print("\nChoose Creative Mode:")
-        print("1. Particle Systems (physics-based animations)")
-        print("2. Geometric Transformations (shape morphing)")
-        print("3. Pattern Generation (recursive/emergent)")
-        print("4. Text Art (shape-based/organic)")
-        print("5. Optical Illusions & Visual Puzzles")
-        print("6. Custom Guidelines")
-        print("\nEnter choice (1-6) or press Enter to skip: ")
-        return input().strip()
+        print(_CREATIVE_MODE_MENU)
+        return self._prompt_choice().strip()
 
     def _get_custom_guidelines(self):
         """Get custom guidelines from user"""
         print("\nEnter your custom creative guidelines:")
-        return input().strip()
+        return self._prompt_choice().strip()
 
     def _get_text_input(self):
         """Get text input for text art"""
         print("\nWhat text would you like to create? (e.g. 'PRISM', 'Hello', etc.)")
-        text = input().strip() or "PRISM"
+        text = self._prompt_choice().strip() or "PRISM"
         
         print("\nWould you like to add any additional instructions? (e.g. 'only vertical motion', 'use specific colors', etc.)")
         print("Press Enter to skip")
-        extra = input("> ").strip()
+        extra = self._prompt_choice("> ").strip()
         
         return text, extra if extra else None 
\ No newline at end of file
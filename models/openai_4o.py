@@ -1,30 +1,20 @@
 from typing import Optional, List, Dict, Tuple
 import re
-from openai import OpenAI
 from logger import ArtLogger
 from config import Config
 import random
+import time
+import asyncio
+from itertools import chain
+import hashlib
+import shelve
+from importlib.util import find_spec
 
-class OpenAI4OGenerator:
-    def __init__(self, config: Config, logger: ArtLogger = None):
-        self.config = config
-        self.log = logger or ArtLogger()
-        self.client = OpenAI(api_key=config.openai_key)
-        
-        # Track current model
-        self.current_model = None
-    
-    def generate_with_ai(self, prompt: str, temperature: float = 0.85) -> Optional[str]:
-        """Generate code using OpenAI API with better error handling"""
-        try:
-            structured_prompt = self._build_generation_prompt(prompt)
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a creative coder crafting generative art with Processing.
+# Avoid patterns come from the database and only change as new sketches are saved
+_AVOID_PATTERNS_TTL = 30.0
+
+# Static system prompt shared by every generation request
+_SYSTEM_PROMPT = """You are a creative coder crafting generative art with Processing.
 Your task is to write ONLY the creative code that will be inserted into a template.
 DO NOT write setup() or draw() functions - these are handled by the template.
 DO NOT use translate(), background(), size(), or frameRate() - these are handled by the template.
@@ -38,63 +28,11 @@ The template provides:
 
 Focus on writing the actual creative code that will be inserted into the draw() function.
 Return ONLY the code that creates the visual elements."""
-                    },
-                    {"role": "user", "content": structured_prompt}
-                ],
-                temperature=temperature,
-                max_tokens=3500,
-            )
-            
-            if not response.choices:
-                self.log.error("No response generated from AI")
-                return None
-            
-            # Log the raw response first (this is safe)
-            raw_content = response.choices[0].message.content
-            self.log.debug(f"\n=== AI RESPONSE ===\n{raw_content}\n==================\n")
-            
-            # Then try to log any available metadata
-            self.log.debug("\n=== RESPONSE METADATA ===")
-            try:
-                self.log.debug(f"Model: {response.model}")
-                self.log.debug(f"Usage: {response.usage}")
-                self.log.debug(f"Created: {response.created}")
-            except AttributeError as e:
-                self.log.debug(f"Some metadata not available: {e}")
-            self.log.debug("==================\n")
-            
-            code = self._extract_code_from_response(raw_content)
-            
-            # Validate creative code first
-            is_valid, error_msg = self.validate_creative_code(code)
-            if not is_valid:
-                self.log.debug(f"\n=== VALIDATION ERROR ===\nCreative validation failed: {error_msg}\n==================\n")
-                raise ValueError(f"Creative validation: {error_msg}")
-            
-            # Final safety check
-            if not self._is_safe_code(code):
-                self.log.debug("\n=== VALIDATION ERROR ===\nFailed final safety check\n==================\n")
-                return None
-                
-            return code
-            
-        except Exception as e:
-            self.log.error(f"AI generation error: {e}")
-            return None
 
-    def _build_generation_prompt(self, techniques: str) -> str:
-        """Build a focused creative prompt"""
-        # Get historical patterns to avoid repetition
-        recent_patterns = self.config.db_manager.get_recent_patterns(limit=3)
-        historical_techniques = self.config.db_manager.get_historical_techniques(limit=5)
-        avoid_patterns = self._get_avoid_patterns(recent_patterns, historical_techniques)
-        
-        # Get random subset of techniques from each category for inspiration
-        geometry_techniques = self._get_random_techniques_from_category('geometry', 3)
-        motion_techniques = self._get_random_techniques_from_category('motion', 3)
-        pattern_techniques = self._get_random_techniques_from_category('patterns', 3)
-        
-        return f"""=== PROCESSING SKETCH GENERATOR ===
+_SYSTEM_MSG = {"role": "system", "content": _SYSTEM_PROMPT}
+
+# Static sections of the generation prompt; only the technique slots vary per call
+_PROMPT_HEAD = """=== PROCESSING SKETCH GENERATOR ===
 Create a visually appealing animation that loops smoothly over 6 seconds.
 Let your creativity guide the direction - feel free to explore and experiment.
 
@@ -125,20 +63,27 @@ These are handled by the system - do not declare or use them in your snippet:
 • The 'progress' variable (already provided)
 
 === CREATIVE DIRECTION ===
-• Consider exploring these techniques: {techniques}
-{f"• Try something different than: {', '.join(avoid_patterns)}" if avoid_patterns else ""}
+• Consider exploring these techniques: """
+
+_PROMPT_GEOMETRY = """
 
 === TECHNIQUES & APPROACHES ===
 Form & Structure:
-• {', '.join(geometry_techniques)}
+• """
+
+_PROMPT_MOTION = """
 • Explore shape relationships and transformations
 
 Movement & Flow:
-• {', '.join(motion_techniques)}
+• """
+
+_PROMPT_PATTERN = """
 • Discover unexpected animation patterns
 
 Pattern & Texture:
-• {', '.join(pattern_techniques)}
+• """
+
+_PROMPT_TAIL = """
 • Build evolving pattern systems
 
 === IMPORTANT: CODE FORMAT ===
@@ -146,81 +91,622 @@ Return ONLY your creative code between these markers:
 // YOUR CREATIVE CODE GOES HERE
 // END OF YOUR CREATIVE CODE"""
 
-    def _get_avoid_patterns(self, recent_patterns, historical_techniques, max_avoid=5) -> List[str]:
-        """Helper method to build list of patterns to avoid"""
-        avoid_patterns = []
+# Multi-prompt batches ask for each sketch under its own numbered header
+_SKETCH_HEADER = "=== SKETCH {} ==="
+_SKETCH_HEADER_RE = re.compile(r'^=== SKETCH (\d+) ===[ \t]*$', re.MULTILINE)
+_BATCH_SYSTEM_MSG = {"role": "system", "content": _SYSTEM_PROMPT + """
+
+You will receive several numbered sketch requests. Answer every request in order.
+Start each answer with its header line exactly as given (e.g. === SKETCH 1 ===),
+followed by that sketch's code between the required markers."""}
+_TOKENS_PER_SKETCH = 3500
+_MAX_OUTPUT_TOKENS = 16384
+
+# Concurrent single-sketch requests kept in flight by default
+_MAX_CONCURRENCY = 5
+
+_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Template structure checked by validate_core_requirements: (required literal, pattern, error)
+_CORE_REQUIREMENTS = [
+    ('void setup()', re.compile(r'void setup\(\)\s*{[^}]*size\(1080,\s*1080\)[^}]*}', re.DOTALL), "setup() function modified"),
+    ('void draw()', re.compile(r'void draw\(\)\s*{.*background\(0\).*translate\(width/2,\s*height/2\)', re.DOTALL), "draw() function header modified"),
+    ('renderPath', re.compile(r'String\s+renderPath\s*=\s*"renders/render_v\d+"', re.DOTALL), "renderPath declaration missing/modified"),
+    ('saveFrame(renderPath', re.compile(r'saveFrame\(renderPath\s*\+\s*"/frame-####\.png"\)', re.DOTALL), "saveFrame call missing/modified"),
+]
+
+_START_MARKER = "// YOUR CREATIVE CODE GOES HERE"
+_END_MARKER = "// END OF YOUR CREATIVE CODE"
+
+_MD_FENCE = "```"
+_DEFINITION_KEYWORDS = ('void', 'class')
+_LET_DECL_RE = re.compile(r'let\s+(\w+)\s*=')
+
+# Critical system-level functions that would break the sketch
+_CRITICAL_FORBIDDEN = (
+    ('setup(', 'Contains setup()'),
+    ('draw(', 'Contains draw()'),
+    ('background(', 'Contains background()'),
+    ('size(', 'Contains size()'),
+    ('frameRate(', 'Contains frameRate()'),
+)
+
+# translate(width/2 ...) and friends; the template has already centered the origin
+_ORIGIN_RECENTER_RE = re.compile(r'translate\(\s*(?:width|height)\s*/\s*2')
+
+# Critical JavaScript syntax that can't be auto-fixed
+_CRITICAL_JS_PATTERNS = [
+    (re.compile(r'color\(([\'"]#[0-9a-fA-F]+[\'"]\))'), "Use RGB values instead of hex codes: color(255, 0, 0)"),
+    (re.compile(r'\b(push|pop)\s*\(\s*\)'), "Use pushMatrix()/popMatrix() instead of push()/pop()"),
+    (re.compile(r'createVector\s*\('), "Use 'new PVector()' instead of createVector()"),
+]
+
+# All critical JS patterns fused into one alternation; group jsN maps to _CRITICAL_JS_PATTERNS[N]
+_JS_COMBINED_RE = re.compile('|'.join(
+    f'(?P<js{i}>{pattern.pattern})' for i, (pattern, _) in enumerate(_CRITICAL_JS_PATTERNS)
+))
+
+def _critical_js_error(match) -> str:
+    """Error message for a _JS_COMBINED_RE match"""
+    return _CRITICAL_JS_PATTERNS[int(match.lastgroup[2:])][1]
+
+# Streamed responses are scanned for critical JS syntax every N new characters
+_STREAM_CHECK_INTERVAL = 200
+
+def _strip_md_fences(content: str) -> str:
+    """Drop ``` fences along with any language tag and trailing whitespace"""
+    if _MD_FENCE not in content:
+        return content
+    pieces = []
+    pos = 0
+    end = len(content)
+    start = content.find(_MD_FENCE)
+    while start != -1:
+        pieces.append(content[pos:start])
+        i = start + len(_MD_FENCE)
+        while i < end and (content[i].isalnum() or content[i] == '_'):
+            i += 1
+        while i < end and content[i].isspace():
+            i += 1
+        pos = i
+        start = content.find(_MD_FENCE, pos)
+    pieces.append(content[pos:])
+    return ''.join(pieces)
+
+def _is_definition_start(stripped: str) -> bool:
+    """True for lines like 'void name...' or 'class Name...'"""
+    for keyword in _DEFINITION_KEYWORDS:
+        if stripped.startswith(keyword):
+            rest = stripped[len(keyword):]
+            name = rest.lstrip()
+            return (len(name) < len(rest) and name != ''
+                    and (name[0].isalnum() or name[0] == '_'))
+    return False
+
+def _classify_lines(code: str) -> Tuple[List[str], List[str], bool, bool]:
+    """Split creative code into (definition lines, draw lines, has runSketch, has initSketch)"""
+    # Look for function definitions and class definitions in one pass
+    global_code = []
+    draw_code = []
+    function_buffer = []
+    in_function = False
+    brace_depth = 0
+    body_opened = False
+    has_run_sketch = False
+    has_init_sketch = False
+    
+    for line in code.split('\n'):
+        stripped = line.strip()
+        # Skip empty lines and comment markers
+        if not stripped or stripped == _START_MARKER or stripped == _END_MARKER:
+            continue
         
-        # Add techniques from recent patterns
-        if recent_patterns:
-            recent_techniques = [tech for pattern in recent_patterns for tech in pattern.techniques]
-            avoid_patterns.extend(recent_techniques)
+        if in_function:
+            function_buffer.append(line)
+        elif _is_definition_start(stripped):
+            # Function or class definition start; nested methods stay in the outer buffer
+            in_function = True
+            function_buffer = [line]
+            brace_depth = 0
+            body_opened = False
+        else:
+            if not stripped.startswith('//'):
+                draw_code.append(line)
+            continue
         
-        # Add commonly used historical techniques
-        if historical_techniques:
-            recent_combos = [tech for pattern in historical_techniques for tech in pattern]
-            from collections import Counter
-            common_techniques = Counter(recent_combos).most_common(3)
-            avoid_patterns.extend(tech for tech, _ in common_techniques)
+        # Track braces so '} else {' or nested blocks don't end the definition early
+        if '{' in stripped:
+            body_opened = True
+            brace_depth += stripped.count('{')
+        if '}' in stripped:
+            brace_depth -= stripped.count('}')
         
-        # Remove duplicates and limit
-        return list(dict.fromkeys(avoid_patterns))[:max_avoid]
+        if body_opened and brace_depth <= 0:
+            in_function = False
+            for buffered in function_buffer:
+                has_run_sketch = has_run_sketch or 'void runSketch(float progress)' in buffered
+                has_init_sketch = has_init_sketch or 'void initSketch()' in buffered
+            global_code.extend(function_buffer)
+            function_buffer = []
+    
+    return global_code, draw_code, has_run_sketch, has_init_sketch
+
+def _http_client_options() -> dict:
+    """Keep-alive pool settings for the OpenAI transport; HTTP/2 needs the optional h2 package"""
+    import httpx
+    return {
+        'http2': find_spec('h2') is not None,
+        'limits': httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=60.0),
+        'timeout': httpx.Timeout(600.0, connect=5.0),
+    }
+
+class OpenAI4OGenerator:
+    def __init__(self, config: Config, logger: ArtLogger = None):
+        self.config = config
+        self.log = logger or ArtLogger()
+        # Imported here so the OpenAI/httpx stack only loads when a generator is built
+        import httpx
+        from openai import OpenAI
+        self.client = OpenAI(
+            api_key=config.openai_key,
+            http_client=httpx.Client(**_http_client_options()),
+            max_retries=2,
+        )
+        
+        # Track current model
+        self.current_model = None
+        
+        # Private RNG so technique picks can be seeded without touching global random state
+        self._rng = random.Random()
+        
+        # (fetched_at, avoid_patterns) from the last database lookup
+        self._avoid_cache: Tuple[float, List[str]] = (0.0, [])
+        
+        # Immutable snapshot of the technique categories used for random picks
+        self._technique_categories = {
+            category: tuple(techniques)
+            for category, techniques in config.technique_categories.items()
+        }
+        
+        # Optional response cache: exact hits by built-prompt digest, near-duplicates by embedding
+        cache_config = config.model_config.get('response_cache', {}).get('4o', {})
+        self._cache_enabled = cache_config.get('enabled', False)
+        self._semantic_cache = self._cache_enabled and cache_config.get('semantic', False)
+        self._similarity_threshold = cache_config.get('similarity_threshold', 0.95)
+        self._cache_path = cache_config.get('path')
+        self._exact_cache: Dict[str, str] = {}
+        self._embed_cache: List[Tuple[float, object, str]] = []
+        if self._cache_enabled and self._cache_path:
+            try:
+                with shelve.open(str(self._cache_path)) as db:
+                    self._exact_cache.update(db)
+            except Exception as e:
+                self.log.debug(f"Could not load prompt cache: {e}")
+    
+    def generate_with_ai(self, prompt: str, temperature: float = 0.85) -> Optional[str]:
+        """Generate code using OpenAI API with better error handling"""
+        try:
+            structured_prompt = self._build_generation_prompt(prompt)
+            
+            embedding = None
+            if self._cache_enabled:
+                cached, embedding = self._cache_lookup(structured_prompt, prompt, temperature)
+                if cached:
+                    return cached
+            
+            stream = self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    _SYSTEM_MSG,
+                    {"role": "user", "content": structured_prompt}
+                ],
+                temperature=temperature,
+                max_tokens=3500,
+                stream=True,
+            )
+            
+            raw_content = self._collect_stream(stream)
+            if raw_content is None:
+                self.log.debug("\n=== VALIDATION ERROR ===\nStream aborted on invalid code\n==================\n")
+                return None
+            if not raw_content:
+                self.log.error("No response generated from AI")
+                return None
+            
+            # Log the raw response first; skip building the large message when debug is off
+            if self.log.debug_enabled:
+                self.log.debug(f"\n=== AI RESPONSE ===\n{raw_content}\n==================\n")
+            
+            code = self._extract_code_from_response(raw_content)
+            
+            # Validate creative code first
+            is_valid, error_msg = self.validate_creative_code(code)
+            if not is_valid:
+                self.log.debug(f"\n=== VALIDATION ERROR ===\nCreative validation failed: {error_msg}\n==================\n")
+                raise ValueError(f"Creative validation: {error_msg}")
+            
+            # Final safety check
+            if not self._is_safe_code(code):
+                self.log.debug("\n=== VALIDATION ERROR ===\nFailed final safety check\n==================\n")
+                return None
+            
+            if self._cache_enabled:
+                self._cache_store(structured_prompt, temperature, code, embedding)
+                
+            return code
+            
+        except Exception as e:
+            self.log.error(f"AI generation error: {e}")
+            return None
+
+    @staticmethod
+    def _cache_key(prompt: str, temperature: float) -> str:
+        """Stable digest for a (prompt, temperature) pair, usable as a shelve key"""
+        return hashlib.blake2b(f"{temperature:.2f}\n{prompt}".encode(), digest_size=16).hexdigest()
+
+    def _cache_lookup(self, full_prompt: str, prompt: str, temperature: float) -> Tuple[Optional[str], object]:
+        """Return (cached code or None, prompt embedding or None).
+        
+        Exact hits need the same built prompt. Near-duplicates are matched on the
+        caller's prompt, since the shared static head makes every built prompt look alike.
+        """
+        code = self._exact_cache.get(self._cache_key(full_prompt, temperature))
+        if code:
+            self.log.debug("Prompt cache hit (exact)")
+            return code, None
+        
+        if not self._semantic_cache:
+            return None, None
+        
+        embedding = self._embed_prompt(prompt)
+        if embedding is None:
+            return None, None
+        
+        best_score, best_code = 0.0, None
+        for cached_temperature, vector, cached_code in self._embed_cache:
+            if cached_temperature != round(temperature, 2):
+                continue
+            score = float(vector @ embedding)
+            if score > best_score:
+                best_score, best_code = score, cached_code
+        
+        if best_code and best_score >= self._similarity_threshold:
+            self.log.debug(f"Prompt cache hit (similarity {best_score:.3f})")
+            return best_code, embedding
+        return None, embedding
+
+    def _cache_store(self, full_prompt: str, temperature: float, code: str, embedding=None):
+        """Remember validated code for this built prompt in memory and on disk"""
+        key = self._cache_key(full_prompt, temperature)
+        self._exact_cache[key] = code
+        if embedding is not None:
+            self._embed_cache.append((round(temperature, 2), embedding, code))
+        
+        if self._cache_path:
+            try:
+                with shelve.open(str(self._cache_path)) as db:
+                    db[key] = code
+            except Exception as e:
+                self.log.debug(f"Could not persist prompt cache entry: {e}")
+
+    def _embed_prompt(self, prompt: str):
+        """Unit-length embedding of the prompt, or None if the request fails"""
+        import numpy as np
+        
+        try:
+            response = self.client.embeddings.create(model=_EMBEDDING_MODEL, input=prompt)
+            vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        except Exception as e:
+            self.log.debug(f"Prompt embedding failed: {e}")
+            return None
+        
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _collect_stream(self, stream) -> Optional[str]:
+        """Accumulate a streamed completion, stopping at the end marker.
+        
+        Returns None if a forbidden call or critical JavaScript syntax shows up
+        inside the creative code block, since validation would reject the
+        result anyway.
+        """
+        content = ""
+        scanned = 0
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                content += delta
+                
+                # Only rescan once enough new text has arrived
+                if len(content) - scanned < _STREAM_CHECK_INTERVAL:
+                    continue
+                
+                error, done = self._scan_stream(content)
+                if error:
+                    self.log.error(error)
+                    return None
+                if done:
+                    break
+                scanned = len(content)
+        finally:
+            stream.close()
+        
+        return content
+
+    def _scan_stream(self, content: str) -> Tuple[Optional[str], bool]:
+        """Check the creative block received so far; return (error or None, end marker seen).
+        
+        Only text that extraction keeps unchanged is scanned: the block up to a repeated
+        start marker or the end marker, while it is ASCII without markdown fences. Loose
+        top-level lines are dropped once a runSketch definition turns up, so both checks
+        only look at definitions that have already closed.
+        """
+        start = content.find(_START_MARKER)
+        if start == -1:
+            return None, False
+        body = start + len(_START_MARKER)
+        
+        limit = len(content)
+        for marker in (_START_MARKER, _END_MARKER):
+            idx = content.find(marker, body, limit)
+            if idx != -1:
+                limit = idx
+        done = limit < len(content)
+        if not done:
+            # A partial last line may still change how its braces are counted
+            limit = max(body, content.rfind('\n', body, limit))
+        # Text before the start marker is dropped by extraction, so only the block matters
+        block = content[body:limit]
+        if not block.isascii() or '`' in block:
+            return None, done
+        
+        definitions = '\n'.join(_classify_lines(block)[0])
+        if not definitions:
+            return None, done
+        is_valid, error = self.validate_creative_code(definitions)
+        if not is_valid:
+            return f"Creative validation failed: {error}", done
+        match = _JS_COMBINED_RE.search(definitions)
+        if match:
+            return f"Critical JavaScript syntax found:\n• {_critical_js_error(match)}", done
+        return None, done
+
+    def generate_batch(self, prompt: str, n: int, temperature: float = 0.85) -> List[str]:
+        """Generate up to n sketches from a single API request using the n parameter"""
+        try:
+            structured_prompt = self._build_generation_prompt(prompt)
+            
+            response = self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    _SYSTEM_MSG,
+                    {"role": "user", "content": structured_prompt}
+                ],
+                temperature=temperature,
+                max_tokens=3500,
+                n=n,
+            )
+        except Exception as e:
+            self.log.error(f"AI batch generation error: {e}")
+            return []
+        
+        codes = []
+        for i, choice in enumerate(response.choices, 1):
+            code = self._validate_generated_content(choice.message.content)
+            if code:
+                codes.append(code)
+            else:
+                self.log.debug(f"Batch sketch {i}/{n} rejected")
+        
+        self.log.debug(f"Batch generation returned {len(codes)}/{n} valid sketches")
+        return codes
+
+    def generate_prompt_batch(self, prompts: List[str], temperature: float = 0.85) -> List[Optional[str]]:
+        """Generate one sketch per prompt from a single API request.
+        
+        Results line up with prompts; a sketch that is missing or fails
+        validation comes back as None without affecting the others.
+        """
+        if not prompts:
+            return []
+        
+        try:
+            sections = [
+                f"{_SKETCH_HEADER.format(i)}\n{self._build_generation_prompt(prompt)}"
+                for i, prompt in enumerate(prompts, 1)
+            ]
+            
+            response = self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    _BATCH_SYSTEM_MSG,
+                    {"role": "user", "content": "\n\n".join(sections)}
+                ],
+                temperature=temperature,
+                max_tokens=min(_TOKENS_PER_SKETCH * len(prompts), _MAX_OUTPUT_TOKENS),
+            )
+            raw_content = response.choices[0].message.content if response.choices else None
+        except Exception as e:
+            self.log.error(f"AI batch generation error: {e}")
+            return [None] * len(prompts)
+        
+        if not raw_content:
+            self.log.error("No response generated from AI")
+            return [None] * len(prompts)
+        
+        # Slice the response at each header; a repeated number keeps the first answer
+        answers = {}
+        headers = list(_SKETCH_HEADER_RE.finditer(raw_content))
+        for header, next_header in zip(headers, headers[1:] + [None]):
+            end = next_header.start() if next_header else len(raw_content)
+            answers.setdefault(int(header.group(1)), raw_content[header.end():end])
+        
+        codes = []
+        for i in range(1, len(prompts) + 1):
+            answer = answers.get(i)
+            code = self._validate_generated_content(answer) if answer else None
+            if code is None:
+                self.log.debug(f"Batch sketch {i}/{len(prompts)} missing or rejected")
+            codes.append(code)
+        
+        if self.log.debug_enabled:
+            valid = sum(code is not None for code in codes)
+            self.log.debug(f"Prompt batch returned {valid}/{len(prompts)} valid sketches")
+        return codes
+
+    def generate_concurrent(self, prompts: List[str], max_concurrency: int = _MAX_CONCURRENCY, temperature: float = 0.85) -> List[Optional[str]]:
+        """Generate one sketch per prompt with up to max_concurrency requests in flight"""
+        return asyncio.run(self.agenerate_many(prompts, max_concurrency, temperature))
+
+    async def agenerate_many(self, prompts: List[str], max_concurrency: int = _MAX_CONCURRENCY, temperature: float = 0.85) -> List[Optional[str]]:
+        """Async counterpart of generate_concurrent for callers already inside an event loop"""
+        import httpx
+        from openai import AsyncOpenAI
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        # The async client is tied to the running event loop, so it lives only for this call
+        async with AsyncOpenAI(
+            api_key=self.config.openai_key,
+            http_client=httpx.AsyncClient(**_http_client_options()),
+            max_retries=2,
+        ) as client:
+            async def run_one(prompt):
+                async with semaphore:
+                    return await self._agenerate_with_ai(client, prompt, temperature)
+            return list(await asyncio.gather(*(run_one(prompt) for prompt in prompts)))
+
+    async def _agenerate_with_ai(self, client, prompt: str, temperature: float) -> Optional[str]:
+        """Async single-sketch generation used by agenerate_many"""
+        try:
+            structured_prompt = self._build_generation_prompt(prompt)
+            
+            response = await client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    _SYSTEM_MSG,
+                    {"role": "user", "content": structured_prompt}
+                ],
+                temperature=temperature,
+                max_tokens=3500,
+            )
+            
+            if not response.choices:
+                self.log.error("No response generated from AI")
+                return None
+            
+            return self._validate_generated_content(response.choices[0].message.content)
+            
+        except Exception as e:
+            self.log.error(f"AI generation error: {e}")
+            return None
+
+    def _validate_generated_content(self, raw_content: str) -> Optional[str]:
+        """Extract code from a raw completion and return it only if it passes validation"""
+        code = self._extract_code_from_response(raw_content)
+        if not code:
+            self.log.debug("Failed to extract code from response")
+            return None
+        
+        is_valid, error_msg = self.validate_creative_code(code)
+        if not is_valid:
+            self.log.debug(f"Creative validation failed: {error_msg}")
+            return None
+        
+        if not self._is_safe_code(code):
+            self.log.debug("Failed final safety check")
+            return None
+        
+        return code
+
+    def _build_generation_prompt(self, techniques: str) -> str:
+        """Build a focused creative prompt"""
+        # Get historical patterns to avoid repetition
+        avoid_patterns = self._get_cached_avoid_patterns()
+        
+        # Get random subset of techniques from each category for inspiration
+        geometry_techniques = self._get_random_techniques_from_category('geometry', 3)
+        motion_techniques = self._get_random_techniques_from_category('motion', 3)
+        pattern_techniques = self._get_random_techniques_from_category('patterns', 3)
+        
+        avoid_line = f"• Try something different than: {', '.join(avoid_patterns)}" if avoid_patterns else ""
+        
+        return "".join((
+            _PROMPT_HEAD, techniques, "\n",
+            avoid_line,
+            _PROMPT_GEOMETRY, ", ".join(geometry_techniques),
+            _PROMPT_MOTION, ", ".join(motion_techniques),
+            _PROMPT_PATTERN, ", ".join(pattern_techniques),
+            _PROMPT_TAIL,
+        ))
+
+    def _get_cached_avoid_patterns(self) -> List[str]:
+        """Get avoid patterns, refetching from the database at most every _AVOID_PATTERNS_TTL seconds"""
+        fetched_at, avoid_patterns = self._avoid_cache
+        now = time.monotonic()
+        if fetched_at and now - fetched_at < _AVOID_PATTERNS_TTL:
+            return avoid_patterns
+        
+        recent_patterns, historical_techniques = self.config.db_manager.get_prompt_context(
+            recent_limit=3, history_limit=5
+        )
+        avoid_patterns = self._get_avoid_patterns(recent_patterns, historical_techniques)
+        self._avoid_cache = (now, avoid_patterns)
+        return avoid_patterns
+
+    def _get_avoid_patterns(self, recent_patterns, historical_techniques, max_avoid=5) -> List[str]:
+        """Helper method to build list of patterns to avoid"""
+        # Techniques from recent patterns first, then the most common historical ones
+        recent_techniques = chain.from_iterable(pattern.techniques for pattern in recent_patterns or ())
+        # History is a handful of short lists, so a plain dict count beats Counter.most_common;
+        # the stable sort keeps first-seen order among ties, as most_common does
+        counts = {}
+        for tech in chain.from_iterable(historical_techniques or ()):
+            counts[tech] = counts.get(tech, 0) + 1
+        common_techniques = sorted(counts, key=counts.__getitem__, reverse=True)[:3]
+        
+        # Remove duplicates (keeping first-seen order) and stop once the limit is reached
+        avoid_patterns = {}
+        for tech in chain(recent_techniques, common_techniques):
+            if len(avoid_patterns) >= max_avoid:
+                break
+            avoid_patterns[tech] = None
+        return list(avoid_patterns)
 
     def _get_random_techniques_from_category(self, category: str, count: int = 3) -> List[str]:
         """Get random techniques from a specific category in config"""
-        if category not in self.config.technique_categories:
+        techniques = self._technique_categories.get(category)
+        if techniques is None:
             return []
         
-        techniques = self.config.technique_categories[category]
-        count = min(count, len(techniques))
-        return random.sample(techniques, count)
+        total = len(techniques)
+        if count * 2 > total:
+            return self._rng.sample(techniques, min(count, total))
+        
+        # Small picks from a larger category: draw indices instead of copying the pool
+        picked = {}
+        while len(picked) < count:
+            picked.setdefault(self._rng.randrange(total), None)
+        return [techniques[i] for i in picked]
 
     def _extract_code_from_response(self, content: str) -> Optional[str]:
         """Extract and clean code from AI response with proper structure"""
         try:
             # Clean special characters and ensure ASCII compatibility first
-            content = content.encode('ascii', 'ignore').decode()
-            content = re.sub(r'[^\x00-\x7F]+', '', content)
+            if not content.isascii():
+                content = content.encode('ascii', 'ignore').decode('ascii')
             
             # Remove markdown code block markers
-            content = re.sub(r'```\w*\s*', '', content)
-            content = re.sub(r'```\s*$', '', content)
+            content = _strip_md_fences(content)
             
             # Extract code between markers
-            code = self._extract_between_markers(
-                content,
-                "// YOUR CREATIVE CODE GOES HERE",
-                "// END OF YOUR CREATIVE CODE"
-            )
-            
-            # Look for function definitions and class definitions
-            global_code = []
-            draw_code = []
+            code = self._extract_between_markers(content, _START_MARKER, _END_MARKER)
             
-            lines = code.split('\n')
-            in_function = False
-            function_buffer = []
-            
-            for line in lines:
-                stripped = line.strip()
-                # Skip empty lines and comment markers
-                if not stripped or stripped in ["// YOUR CREATIVE CODE GOES HERE", "// END OF YOUR CREATIVE CODE"]:
-                    continue
-                    
-                # Check for function or class definition start
-                if re.match(r'\s*(void|class)\s+\w+.*{?\s*$', stripped):
-                    in_function = True
-                    function_buffer = [line]
-                    continue
-                
-                if in_function:
-                    function_buffer.append(line)
-                    if '}' in line and line.strip() == '}':
-                        in_function = False
-                        global_code.extend(function_buffer)
-                        function_buffer = []
-                else:
-                    if stripped and not stripped.startswith('//'):
-                        draw_code.append(line)
+            # Split definitions from loose draw statements
+            global_code, draw_code, has_run_sketch, has_init_sketch = _classify_lines(code)
             
             # Combine code with proper structure
             final_code = []
@@ -231,14 +717,13 @@ Return ONLY your creative code between these markers:
                 final_code.append('')  # Empty line for spacing
             
             # Add draw code inside runSketch
-            if draw_code:
-                if not any('void runSketch(float progress)' in line for line in global_code):
-                    final_code.append('void runSketch(float progress) {')
-                    final_code.extend('  ' + line for line in draw_code)
-                    final_code.append('}')
+            if draw_code and not has_run_sketch:
+                final_code.append('void runSketch(float progress) {')
+                final_code.extend('  ' + line for line in draw_code)
+                final_code.append('}')
             
             # Add initSketch if not present
-            if not any('void initSketch()' in line for line in global_code):
+            if not has_init_sketch:
                 final_code.extend([
                     '',
                     'void initSketch() {',
@@ -255,82 +740,55 @@ Return ONLY your creative code between these markers:
     def _extract_between_markers(self, code: str, start_marker: str, end_marker: str) -> str:
         """Extract code between markers for validation"""
         try:
-            parts = code.split(start_marker)
-            if len(parts) < 2:
+            start = code.find(start_marker)
+            if start == -1:
                 return code
-            code = parts[1]
-            parts = code.split(end_marker)
-            if len(parts) < 1:
-                return code
-            return parts[0].strip()
+            start += len(start_marker)
+            # Stop at a repeated start marker or the end marker, whichever comes first
+            end = len(code)
+            for marker in (start_marker, end_marker):
+                idx = code.find(marker, start, end)
+                if idx != -1:
+                    end = idx
+            return code[start:end].strip()
         except Exception as e:
             self.log.error(f"Error extracting between markers: {e}")
             return code
 
     def _is_safe_code(self, code: str) -> bool:
         """Less strict validation of Processing syntax, focusing on critical issues"""
-        errors = []
-        
-        # Only check for critical JavaScript syntax that can't be auto-fixed
-        critical_js_patterns = [
-            (r'color\(([\'"]#[0-9a-fA-F]+[\'"]\))', "Use RGB values instead of hex codes: color(255, 0, 0)"),
-            (r'\b(push|pop)\s*\(\s*\)', "Use pushMatrix()/popMatrix() instead of push()/pop()"),
-            (r'createVector\s*\(', "Use 'new PVector()' instead of createVector()"),
-        ]
+        # Only check for critical JavaScript syntax that can't be auto-fixed;
+        # one fused scan clears safe code, the per-pattern pass only reports errors
+        if not _JS_COMBINED_RE.search(code):
+            return True
         
-        for pattern, error in critical_js_patterns:
-            if re.search(pattern, code):
-                errors.append(error)
-        
-        if errors:
-            error_msg = "\n• ".join(errors)
-            self.log.error(f"Critical JavaScript syntax found:\n• {error_msg}")
-            return False
-        
-        return True
+        errors = [error for pattern, error in _CRITICAL_JS_PATTERNS if pattern.search(code)]
+        error_msg = "\n• ".join(errors)
+        self.log.error(f"Critical JavaScript syntax found:\n• {error_msg}")
+        return False
 
     def validate_creative_code(self, code: str) -> tuple[bool, str]:
         """Validate creative code for forbidden elements"""
         if not code.strip():
             return False, "Empty code"
         
-        # Only check for critical system-level functions that would break the sketch
-        critical_forbidden = {
-            'setup(': 'Contains setup()',
-            'draw(': 'Contains draw()',
-            'background(': 'Contains background()',
-            'size(': 'Contains size()',
-            'frameRate(': 'Contains frameRate()',
-        }
-        
         # Check for critical forbidden elements
-        for term, error in critical_forbidden.items():
+        for term, error in _CRITICAL_FORBIDDEN:
             if term in code:
                 return False, error
         
         # Check for absolute translations that would re-center the origin
-        for line in code.split('\n'):
-            line = line.strip()
-            if any(x in line for x in [
-                'translate(width/2', 'translate( width/2', 'translate(width / 2',
-                'translate(height/2', 'translate( height/2', 'translate(height / 2'
-            ]):
-                return False, "Contains origin re-centering - coordinates are already centered"
+        if 'translate(' in code and _ORIGIN_RECENTER_RE.search(code):
+            return False, "Contains origin re-centering - coordinates are already centered"
         
         return True, None
 
     def validate_core_requirements(self, code: str) -> tuple[bool, str]:
         """Validate only essential Processing code requirements, being more lenient"""
-        # Only validate the critical template structure
-        required_structure = [
-            (r'void setup\(\)\s*{[^}]*size\(1080,\s*1080\)[^}]*}', "setup() function modified"),
-            (r'void draw\(\)\s*{.*background\(0\).*translate\(width/2,\s*height/2\)', "draw() function header modified"),
-            (r'String\s+renderPath\s*=\s*"renders/render_v\d+"', "renderPath declaration missing/modified"),
-            (r'saveFrame\(renderPath\s*\+\s*"/frame-####\.png"\)', "saveFrame call missing/modified")
-        ]
-        
-        for pattern, error in required_structure:
-            if not re.search(pattern, code, re.DOTALL):
+        # Only validate the critical template structure; the literal each regex
+        # requires is checked first so a missing piece fails without regex work
+        for literal, pattern, error in _CORE_REQUIREMENTS:
+            if literal not in code or not pattern.search(code):
                 return False, error
         
         return True, None
@@ -338,4 +796,4 @@ Return ONLY your creative code between these markers:
     def _transform_js_to_processing(self, code: str) -> str:
         """Transform JavaScript syntax to Processing syntax"""
         # Replace variable declarations
-        code = re.sub(r'let\s+(\w+)\s*=', r'float \1 =', code)
\ No newline at end of file
+        code = _LET_DECL_RE.sub(r'float \1 =', code)
\ No newline at end of file
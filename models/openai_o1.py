@@ -1,17 +1,138 @@
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Deque
 import re
+import asyncio
+import hashlib
+import shelve
+import threading
+from collections import deque
+from functools import lru_cache
 from openai import OpenAI
 from logger import ArtLogger
 from config import Config
 import random
+import time
+from itertools import chain
 from .text_generator import TextGenerator
 from .validation import CodeValidator
+from .openai_4o import _http_client_options, _EMBEDDING_MODEL
+
+# One pooled client per API key, shared by every generator in the process so
+# new instances reuse warm keep-alive connections instead of handshaking again
+_SHARED_CLIENTS: Dict[str, OpenAI] = {}
+_SHARED_CLIENTS_LOCK = threading.Lock()
+
+def _shared_client(api_key: str) -> OpenAI:
+    """Return the process-wide OpenAI client for api_key, creating it on first use"""
+    with _SHARED_CLIENTS_LOCK:
+        client = _SHARED_CLIENTS.get(api_key)
+        if client is None:
+            import httpx
+            client = OpenAI(api_key=api_key, http_client=httpx.Client(**_http_client_options()))
+            _SHARED_CLIENTS[api_key] = client
+        return client
+
+# Quoted text in a prompt such as: text 'PRISM'
+_QUOTED_TEXT_RE = re.compile(r'text\s+[\'"]([^\'"]+)[\'"]')
+
+# Batched requests: each prompt goes under a REQUEST header, each answer comes back under an ANSWER header
+_BATCH_PREAMBLE = """You will receive {count} separate requests, each starting with a line like === REQUEST 1 ===.
+Answer every request independently and in order. When requests repeat, give a different answer each time.
+Start each answer with the matching header line, e.g. === ANSWER 1 ===, followed by that answer's code
+between the markers the request asks for."""
+_ANSWER_HEADER_RE = re.compile(r'^=== ANSWER (\d+) ===[ \t]*$', re.MULTILINE)
+
+# Prompt sections shared by the wizard and generate_code builders; only the creative parts vary per call
+_SKETCH_FRAMEWORK = """=== REQUIRED FUNCTIONS ===
+You MUST define these two functions:
+1. void initSketch() - Called once at start
+2. void runSketch(float progress) - Called each frame with progress (0.0 to 1.0)
+
+=== SYSTEM FRAMEWORK ===
+The system automatically handles these - DO NOT include them:
+• void setup() or draw() functions
+• size(1080, 1080) and frameRate settings
+• background(0) or any background clearing
+• translate(width/2, height/2) for centering
+• Frame saving and program exit
+
+=== CODE STRUCTURE ===
+1. Define any classes at the top
+2. Declare global variables
+3. Define initSketch() for setup
+4. Define runSketch(progress) for animation
+• The canvas is already centered at (0,0)
+• Initialize all variables with values
+• Use RGB values for colors (e.g., stroke(255, 0, 0) for red)"""
+
+_RETURN_FORMAT = """=== RETURN FORMAT ===
+Return your code between these markers:
+// YOUR CREATIVE CODE GOES HERE
+[your code here]
+// END OF YOUR CREATIVE CODE"""
+
+_WIZARD_PROMPT_HEAD = f"""=== PROCESSING SKETCH GENERATOR ===
+Create a visually appealing processing based animation that loops smoothly over 6 seconds.
+Let your creativity guide the direction - feel free to experiment and innovate.
+
+{_SKETCH_FRAMEWORK}
+
+=== CREATIVE DIRECTION ===
+"""
+
+_CODE_PROMPT_HEAD = f"""=== PROCESSING SKETCH GENERATOR ===
+Create a visually appealing processing animation that loops smoothly over 6 seconds.
+Let your creativity guide the direction - feel free to explore and experiment.
+
+{_SKETCH_FRAMEWORK}
+"""
+
+_ANIMATION_GUIDELINES = f"""
+
+=== ANIMATION GUIDELINES ===
+• Use the progress variable (0.0 to 1.0) for ALL animations
+• Ensure smooth looping by matching start/end states
+• Use map() to convert progress to specific ranges
+• Use lerp() or lerpColor() for smooth transitions
+• Avoid sudden jumps or discontinuities
+• Consider easing functions for natural motion
+• Test values at progress = 0.0, 0.5, and 1.0
+
+{_RETURN_FORMAT}"""
+
+# Static head of every generated prompt. Per-call content (text art, stubs, techniques,
+# avoid list) follows it, so repeated requests share a prompt prefix the API can cache
+_GENERATION_PROMPT_HEAD = f"""=== PROCESSING SKETCH GENERATOR ===
+Create a visually appealing processing animation that loops smoothly over 6 seconds.
+Let your creativity guide the direction - feel free to explore and experiment.
+It's better to do a few things well than try to include everything.
+
+{CodeValidator.PROCESSING_REQUIREMENTS}
+
+{_RETURN_FORMAT}
+
+"""
+
+# Streamed responses: the creative block is rescanned for forbidden calls every N new characters
+_STREAM_CHECK_INTERVAL = 200
+_STREAM_CHECK_OVERLAP = 64
+_STREAM_START_MARKER = "YOUR CREATIVE CODE GOES HERE"
+_STREAM_END_MARKER = "END OF YOUR CREATIVE CODE"
+
+# Prompt-cache hit rate is logged at info level once every N completions
+_USAGE_LOG_INTERVAL = 20
+
+# Avoid patterns come from the database and only change as new sketches are saved
+_AVOID_PATTERNS_TTL = 30.0
+
+# Near-duplicate prompt cache: newest entries kept, each reusable for an hour
+_SEMANTIC_CACHE_SIZE = 256
+_SEMANTIC_CACHE_TTL = 3600.0
 
 class OpenAIO1Generator:
     def __init__(self, config: Config, logger: ArtLogger = None):
         self.config = config
         self.log = logger or ArtLogger()
-        self.client = OpenAI(api_key=config.openai_key)
+        self.client = _shared_client(config.openai_key)
         # Track current model
         self.current_model = None
         # Model ID mapping
@@ -24,6 +145,40 @@ class OpenAIO1Generator:
         self.validator = CodeValidator(logger=self.log, text_generator=self.text_generator)
         # Initialize selected techniques
         self.selected_techniques = []
+        # (fetched_at, avoid_patterns) from the last database lookup
+        self._avoid_cache: Tuple[float, List[str]] = (0.0, [])
+        # Immutable snapshot of the technique categories used for random picks
+        self._technique_categories = {
+            category: tuple(techniques)
+            for category, techniques in config.technique_categories.items()
+        }
+        # (prompt, skip_generation_prompt, full_prompt) from the last prompt build
+        self._last_prompt_cache: Tuple[Optional[str], bool, str] = (None, False, "")
+        
+        # Candidate completions per request (n); only sent when above 1
+        self._speculative_n = max(1, int(config.model_config.get('speculative_n', 1)))
+        # Stream single completions so a forbidden call can end the request early
+        self._stream_responses = self._speculative_n == 1 and config.model_config.get('stream_responses', True)
+        # Completions with usage, prompt tokens sent and how many the API served from its prompt cache
+        self._usage_calls = self._prompt_tokens = self._cached_prompt_tokens = 0
+        
+        # Optional response cache: validated code by (model, full prompt) digest,
+        # and near-duplicate prompts by embedding
+        cache_config = config.model_config.get('response_cache', {}).get('o1', {})
+        self._cache_enabled = cache_config.get('enabled', False)
+        self._semantic_cache = self._cache_enabled and cache_config.get('semantic', False)
+        self._similarity_threshold = cache_config.get('similarity_threshold', 0.95)
+        # (stored_at, model, unit embedding, code), oldest first
+        self._embed_cache: Deque[Tuple[float, str, object, str]] = deque(maxlen=_SEMANTIC_CACHE_SIZE)
+        self._cache_path = cache_config.get('path')
+        self._response_cache: Dict[str, str] = {}
+        self._cache_hits = self._cache_misses = 0
+        if self._cache_enabled and self._cache_path:
+            try:
+                with shelve.open(str(self._cache_path)) as db:
+                    self._response_cache.update(db)
+            except Exception as e:
+                self.log.debug(f"Could not load prompt cache: {e}")
     
     def _select_o1_model(self, model: str = None) -> str:
         """Get the appropriate O1 model to use"""
@@ -41,110 +196,509 @@ class OpenAIO1Generator:
     
     def generate_with_ai(self, prompt: str, skip_generation_prompt: bool = False, is_variation: bool = False, retry_count: int = 0, max_retries: int = 3, last_code: str = None, last_error: str = None) -> Optional[str]:
         """Generate code using OpenAI API with improved error handling and retries"""
-        try:
-            # Check if this is text art and extract text if present
-            is_text_art = self.text_generator.is_text_requirement(prompt)
-            text = "PRISM"  # Default text
-            if is_text_art:
-                text_match = re.search(r'text\s+[\'"]([^\'"]+)[\'"]', prompt)
-                if text_match:
-                    text = text_match.group(1)
-            
-            # Build the prompt based on context
-            if retry_count > 0 and last_code and last_error:
-                # Try auto-injection first
-                fixed_code = self.validator.inject_base_code(last_code, is_text_art, text)
-                if fixed_code != last_code:
-                    self.log.info("Auto-injected missing code stubs")
+        # Check if this is text art and extract text if present
+        is_text_art, text = self._text_art_target(prompt)
+        
+        # Text art prompts differ only in the text, which embeddings barely separate
+        embedding = self._embed_prompt(prompt, is_variation or is_text_art)
+        cached = self._semantic_match(embedding)
+        if cached:
+            return cached
+        
+        for attempt in range(retry_count, max_retries + 1):
+            try:
+                full_prompt, fixed_code = self._prepare_attempt(prompt, skip_generation_prompt, attempt, last_code, last_error, is_text_art, text)
+                if fixed_code is not None:
                     return fixed_code
                 
-                # If can't auto-fix, build focused retry prompt
-                full_prompt = self.validator.build_retry_prompt(last_code, last_error, retry_count)
-            elif skip_generation_prompt:
-                # Even for skipped prompts, ensure stubs are present
-                full_prompt = f"{self.validator.inject_minimal_stubs(is_text_art, text)}\n\n{prompt}"
-            else:
-                # Check if this is a guided prompt
-                is_guided = "=== IMPLEMENTATION REQUIREMENTS ===" in prompt or "Custom Requirements:" in prompt
-                full_prompt = self._build_generation_prompt(prompt, is_text_art, text) if not is_guided else prompt
-            
-            # Log the attempt
-            self.log.debug(f"\n=== SENDING TO AI (Attempt {retry_count + 1}/{max_retries}) ===\n{full_prompt}\n==================\n")
-            
-            # Use the model that was selected
-            selected_model = self._select_o1_model(self.current_model)
-            self.log.debug(f"Using model ID: {selected_model} (from {self.current_model})")
-            
-            # Escape any curly braces in the prompt
-            safe_prompt = full_prompt.replace("{", "{{").replace("}", "}}")
-            
-            response = self.client.chat.completions.create(
-                model=selected_model,
-                messages=[
-                    {"role": "user", "content": safe_prompt}
-                ]
-            )
+                # Log the attempt
+                self.log.debug(f"\n=== SENDING TO AI (Attempt {attempt + 1}/{max_retries}) ===\n{full_prompt}\n==================\n")
+                
+                # Use the model that was selected
+                selected_model = self._select_o1_model(self.current_model)
+                self.log.debug(f"Using model ID: {selected_model} (from {self.current_model})")
+                
+                cache_key, cached = self._cache_lookup(selected_model, full_prompt, is_variation)
+                if cached:
+                    return cached
+                
+                # Escape any curly braces in the prompt
+                safe_prompt = full_prompt.replace("{", "{{").replace("}", "}}")
+                
+                response = self.client.chat.completions.create(
+                    model=selected_model,
+                    messages=[
+                        {"role": "user", "content": safe_prompt}
+                    ],
+                    **self._completion_options()
+                )
+                
+                if self._stream_responses:
+                    code, error_msg = self._check_stream(response, is_variation, is_text_art, text)
+                else:
+                    code, error_msg = self._check_response(response, is_variation, is_text_art, text)
+                if error_msg is None:
+                    self._cache_store(cache_key, code, embedding)
+                    return code
+                self._note_validation_failure(error_msg, attempt, max_retries)
+                last_code, last_error = code, error_msg
+                
+            except Exception as e:
+                # An API or extraction failure says nothing about last_code, so its validation error stays
+                self._note_attempt_error(e, attempt, max_retries)
+        
+        return None
+
+    def generate_concurrent(self, prompts: List[str], max_concurrency: int = 4, skip_generation_prompt: bool = False, is_variation: bool = False) -> List[Optional[str]]:
+        """Generate one sketch per prompt with up to max_concurrency requests in flight"""
+        return asyncio.run(self.agenerate_many(prompts, max_concurrency, skip_generation_prompt, is_variation))
+
+    async def agenerate_many(self, prompts: List[str], max_concurrency: int = 4, skip_generation_prompt: bool = False, is_variation: bool = False) -> List[Optional[str]]:
+        """Async counterpart of generate_concurrent for callers already inside an event loop"""
+        import httpx
+        from openai import AsyncOpenAI
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        # The async client is tied to the running event loop, so it lives only for this call
+        async with AsyncOpenAI(
+            api_key=self.config.openai_key,
+            http_client=httpx.AsyncClient(**_http_client_options()),
+        ) as client:
+            async def run_one(prompt):
+                async with semaphore:
+                    return await self._agenerate_with_ai(client, prompt, skip_generation_prompt, is_variation)
+            # One failed prompt must not cancel the rest of the batch
+            results = await asyncio.gather(*(run_one(prompt) for prompt in prompts), return_exceptions=True)
+        
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                self.log.error(f"AI generation error for prompt {index + 1}: {result}")
+        return [None if isinstance(result, Exception) else result for result in results]
+
+    async def _agenerate_with_ai(self, client, prompt: str, skip_generation_prompt: bool = False, is_variation: bool = False, max_retries: int = 3) -> Optional[str]:
+        """Async generate_with_ai used by agenerate_many; same prompts, validation and retries"""
+        is_text_art, text = self._text_art_target(prompt)
+        last_code = last_error = None
+        
+        embedding = await self._aembed_prompt(client, prompt, is_variation or is_text_art)
+        cached = self._semantic_match(embedding)
+        if cached:
+            return cached
+        
+        for attempt in range(max_retries + 1):
+            try:
+                full_prompt, fixed_code = self._prepare_attempt(prompt, skip_generation_prompt, attempt, last_code, last_error, is_text_art, text)
+                if fixed_code is not None:
+                    return fixed_code
+                
+                self.log.debug(f"\n=== SENDING TO AI (Attempt {attempt + 1}/{max_retries}) ===\n{full_prompt}\n==================\n")
+                
+                selected_model = self._select_o1_model(self.current_model)
+                cache_key, cached = self._cache_lookup(selected_model, full_prompt, is_variation)
+                if cached:
+                    return cached
+                
+                response = await client.chat.completions.create(
+                    model=selected_model,
+                    messages=[
+                        {"role": "user", "content": full_prompt.replace("{", "{{").replace("}", "}}")}
+                    ],
+                    **self._completion_options()
+                )
+                
+                if self._stream_responses:
+                    code, error_msg = await self._acheck_stream(response, is_variation, is_text_art, text)
+                else:
+                    code, error_msg = self._check_response(response, is_variation, is_text_art, text)
+                if error_msg is None:
+                    self._cache_store(cache_key, code, embedding)
+                    return code
+                self._note_validation_failure(error_msg, attempt, max_retries)
+                last_code, last_error = code, error_msg
+                
+            except Exception as e:
+                # An API or extraction failure says nothing about last_code, so its validation error stays
+                self._note_attempt_error(e, attempt, max_retries)
+        
+        return None
+
+    def _cache_lookup(self, model: str, full_prompt: str, is_variation: bool) -> Tuple[Optional[str], Optional[str]]:
+        """Return (cache key or None, cached code or None); variations always go to the API"""
+        if not self._cache_enabled or is_variation:
+            return None, None
+        
+        key = hashlib.sha256(f"{model}\0{full_prompt}".encode()).hexdigest()
+        code = self._response_cache.get(key)
+        if code:
+            self._cache_hits += 1
+        else:
+            self._cache_misses += 1
+        self.log.debug(f"Prompt cache {'hit' if code else 'miss'} ({self._cache_hits} hits, {self._cache_misses} misses)")
+        return key, code
+
+    def _cache_store(self, key: Optional[str], code: str, embedding=None):
+        """Remember validated code for a cache key in memory and on disk"""
+        if embedding is not None:
+            self._embed_cache.append((time.monotonic(), self._select_o1_model(self.current_model), embedding, code))
+        if key is None:
+            return
+        self._response_cache[key] = code
+        
+        if self._cache_path:
+            try:
+                with shelve.open(str(self._cache_path)) as db:
+                    db[key] = code
+            except Exception as e:
+                self.log.debug(f"Could not persist prompt cache entry: {e}")
+
+    def _semantic_match(self, embedding) -> Optional[str]:
+        """Return cached code for the most similar recent prompt to the same model, if close enough"""
+        if embedding is None or not self._embed_cache:
+            return None
+        import numpy as np
+        
+        model = self._select_o1_model(self.current_model)
+        cutoff = time.monotonic() - _SEMANTIC_CACHE_TTL
+        live = [entry for entry in self._embed_cache if entry[0] >= cutoff and entry[1] == model]
+        if not live:
+            return None
+        
+        # Cached vectors are unit length, so one matrix-vector product gives every cosine similarity
+        scores = np.stack([entry[2] for entry in live]) @ embedding
+        best = int(scores.argmax())
+        if scores[best] < self._similarity_threshold:
+            return None
+        self.log.debug(f"Prompt cache hit (similarity {scores[best]:.3f})")
+        return live[best][3]
+
+    def _embed_prompt(self, prompt: str, exact_only: bool):
+        """Unit-length embedding of the prompt, or None when semantic caching does not apply"""
+        if not self._semantic_cache or exact_only:
+            return None
+        try:
+            response = self.client.embeddings.create(model=_EMBEDDING_MODEL, input=prompt)
+        except Exception as e:
+            self.log.debug(f"Prompt embedding failed: {e}")
+            return None
+        return self._unit_embedding(response)
+
+    async def _aembed_prompt(self, client, prompt: str, exact_only: bool):
+        """Async _embed_prompt using the caller's client"""
+        if not self._semantic_cache or exact_only:
+            return None
+        try:
+            response = await client.embeddings.create(model=_EMBEDDING_MODEL, input=prompt)
+        except Exception as e:
+            self.log.debug(f"Prompt embedding failed: {e}")
+            return None
+        return self._unit_embedding(response)
+
+    @staticmethod
+    def _unit_embedding(response):
+        """Normalize the first embedding in an API response to float32 unit length"""
+        import numpy as np
+        
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _prepare_attempt(self, prompt: str, skip_generation_prompt: bool, attempt: int, last_code: Optional[str], last_error: Optional[str], is_text_art: bool, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (full_prompt, None) for the next request, or (None, code) when the last code could be auto-fixed"""
+        if attempt > 0 and last_code and last_error:
+            # Try auto-injection first
+            fixed_code = self.validator.inject_base_code(last_code, is_text_art, text)
+            if fixed_code != last_code:
+                self.log.info("Auto-injected missing code stubs")
+                return None, fixed_code
             
-            if not response.choices:
-                raise ValueError("No response generated from AI")
+            # If can't auto-fix, build focused retry prompt
+            return self.validator.build_retry_prompt(last_code, last_error, attempt), None
+        
+        if attempt > 0 and self._last_prompt_cache[:2] == (prompt, skip_generation_prompt):
+            # Nothing to fix yet (API or extraction error), so resend the prompt already built
+            return self._last_prompt_cache[2], None
+        
+        if skip_generation_prompt:
+            # Even for skipped prompts, ensure stubs are present
+            full_prompt = f"{self.validator.inject_minimal_stubs(is_text_art, text)}\n\n{prompt}"
+        else:
+            # Check if this is a guided prompt
+            is_guided = "=== IMPLEMENTATION REQUIREMENTS ===" in prompt or "Custom Requirements:" in prompt
+            full_prompt = self._build_generation_prompt(prompt, is_text_art, text) if not is_guided else prompt
+        self._last_prompt_cache = (prompt, skip_generation_prompt, full_prompt)
+        return full_prompt, None
+
+    def _completion_options(self) -> dict:
+        """Extra chat.completions.create arguments: n for speculative drafts, otherwise stream when enabled"""
+        if self._speculative_n > 1:
+            return {"n": self._speculative_n}
+        if self._stream_responses:
+            # Usage arrives in a final chunk with no choices
+            return {"stream": True, "stream_options": {"include_usage": True}}
+        return {}
+
+    def _check_response(self, response, is_variation: bool, is_text_art: bool, text: str) -> Tuple[str, Optional[str]]:
+        """Extract and validate the completions; returns (code, error_msg) and raises if no code came back.
+        
+        With several choices the first one that validates wins; otherwise the
+        first failing draft and its error are returned for the retry prompt.
+        """
+        self._note_usage(response.usage)
+        if not response.choices:
+            raise ValueError("No response generated from AI")
+        return self._check_contents([choice.message.content for choice in response.choices], is_variation, is_text_art, text)
+
+    def _check_stream(self, stream, is_variation: bool, is_text_art: bool, text: str) -> Tuple[str, Optional[str]]:
+        """_check_response for a streamed completion, which may stop early on a forbidden call"""
+        content = ""
+        scanned = 0
+        try:
+            for chunk in stream:
+                if chunk.usage:
+                    self._note_usage(chunk.usage)
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                content += chunk.choices[0].delta.content
+                
+                # Only rescan once enough new text has arrived
+                if len(content) - scanned < _STREAM_CHECK_INTERVAL:
+                    continue
+                error_msg, finished = self._scan_stream(content, scanned, is_text_art)
+                if error_msg:
+                    return self._stream_failure(content, error_msg, is_variation, is_text_art, text)
+                if finished:
+                    break
+                scanned = len(content)
+        finally:
+            stream.close()
+        
+        if not content:
+            raise ValueError("No response generated from AI")
+        return self._check_contents([content], is_variation, is_text_art, text)
+
+    async def _acheck_stream(self, stream, is_variation: bool, is_text_art: bool, text: str) -> Tuple[str, Optional[str]]:
+        """Async _check_stream used by agenerate_many"""
+        content = ""
+        scanned = 0
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    self._note_usage(chunk.usage)
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                content += chunk.choices[0].delta.content
                 
+                if len(content) - scanned < _STREAM_CHECK_INTERVAL:
+                    continue
+                error_msg, finished = self._scan_stream(content, scanned, is_text_art)
+                if error_msg:
+                    return self._stream_failure(content, error_msg, is_variation, is_text_art, text)
+                if finished:
+                    break
+                scanned = len(content)
+        finally:
+            await stream.close()
+        
+        if not content:
+            raise ValueError("No response generated from AI")
+        return self._check_contents([content], is_variation, is_text_art, text)
+
+    def _note_usage(self, usage):
+        """Track how much of each prompt the API served from its prompt cache"""
+        if not usage:
+            return
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', None) or 0
+        self._usage_calls += 1
+        self._prompt_tokens += usage.prompt_tokens or 0
+        self._cached_prompt_tokens += cached
+        if self._prompt_tokens:
+            self.log.debug(f"Prompt tokens cached: {cached}/{usage.prompt_tokens} "
+                           f"({100 * self._cached_prompt_tokens / self._prompt_tokens:.0f}% overall)")
+            if self._usage_calls % _USAGE_LOG_INTERVAL == 0:
+                self.log.info(f"Prompt cache hit rate: {self._cached_prompt_tokens / self._prompt_tokens:.1%} "
+                              f"over {self._usage_calls} completions")
+
+    def get_cache_stats(self) -> Dict[str, float]:
+        """Response cache and API prompt cache counters since this generator was created.
+        
+        The API only caches prompts of 1024 tokens or more, so a low token hit
+        rate usually means the static prompt head is too short or has moved.
+        """
+        return {
+            "response_cache_hits": self._cache_hits,
+            "response_cache_misses": self._cache_misses,
+            "completions": self._usage_calls,
+            "prompt_tokens": self._prompt_tokens,
+            "cached_prompt_tokens": self._cached_prompt_tokens,
+            "prompt_cache_hit_rate": self._cached_prompt_tokens / self._prompt_tokens if self._prompt_tokens else 0.0,
+        }
+
+    def _scan_stream(self, content: str, scanned: int, is_text_art: bool) -> Tuple[Optional[str], bool]:
+        """Check the complete lines of the creative block received so far.
+        
+        Returns (error_msg, finished). An error is only reported when the
+        critical validation would certainly reject the final code; finished
+        means the end marker has arrived.
+        """
+        start = content.find(_STREAM_START_MARKER)
+        if start == -1:
+            return None, False
+        body = content.find('\n', start) + 1
+        end = content.find(_STREAM_END_MARKER)
+        if not body or (end != -1 and end < body):
+            # Extraction decides these; leave them to the full check
+            return None, False
+        
+        # Whole lines only, overlapping the previous window so calls split across chunks are caught
+        window_end = content.rfind('\n', body, end if end != -1 else len(content))
+        if window_end == -1:
+            return None, end != -1
+        window_start = max(body, content.rfind('\n', 0, max(body, scanned - _STREAM_CHECK_OVERLAP)) + 1)
+        window = content[window_start:window_end]
+        
+        # clean_code drops repeated start-marker lines and rewrites non-ASCII text, and text art
+        # without an initSketch gets a stub in place of the code, so only plain blocks count
+        if _STREAM_START_MARKER in content[body:window_end] or not window.isascii():
+            return None, end != -1
+        if is_text_art and "void initSketch" not in content[body:window_end]:
+            return None, end != -1
+        for literal, pattern, error in self.validator.CRITICAL_VALIDATION_PATTERNS:
+            if literal in window and pattern.search(window):
+                return error, True
+        return None, end != -1
+
+    def _stream_failure(self, content: str, error_msg: str, is_variation: bool, is_text_art: bool, text: str) -> Tuple[str, str]:
+        """(partial code, error) for a stream stopped early, as _check_contents reports failures"""
+        self.log.debug(f"\n=== AI RESPONSE (stopped early) ===\n{content}\n==================\n")
+        self.log.debug(f"\n=== VALIDATION ERROR ===\nCreative validation failed: {error_msg}\n==================\n")
+        # Stubs go in now, like _check_contents does, so the next attempt builds a retry
+        # prompt instead of auto-injecting them and returning the cut-off code
+        code = self.validator.inject_base_code(self.validator.clean_code(content, is_variation), is_text_art, text)
+        return code, error_msg
+
+    def _check_contents(self, contents: List[str], is_variation: bool, is_text_art: bool, text: str) -> Tuple[str, Optional[str]]:
+        """Extract and validate completion texts; the first that validates wins, else the first failure"""
+        first_failure = None
+        for raw_content in contents:
             # Process response and validate
-            raw_content = response.choices[0].message.content
             self.log.debug(f"\n=== AI RESPONSE ===\n{raw_content}\n==================\n")
             
             code = self.validator.extract_code_from_response(raw_content, is_variation)
             if not code:
-                raise ValueError("Failed to extract code from response")
+                continue
                 
             # Auto-inject required code before validation
             code = self.validator.inject_base_code(code, is_text_art, text)
             
             # Validate the generated code
             is_valid, error_msg = self.validator.validate_creative_code(code, is_snippet=is_variation, is_text_art=is_text_art)
-            if not is_valid:
-                self.log.debug(f"\n=== VALIDATION ERROR ===\nCreative validation failed: {error_msg}\n==================\n")
-                
-                # Attempt retry if we haven't exceeded max retries
-                if retry_count < max_retries:
-                    self.log.debug(f"Attempting retry {retry_count + 1}/{max_retries}")
-                    return self.generate_with_ai(
-                        prompt=prompt,
-                        skip_generation_prompt=skip_generation_prompt,
-                        is_variation=is_variation,
-                        retry_count=retry_count + 1,
-                        max_retries=max_retries,
-                        last_code=code,  # Pass the failed code
-                        last_error=error_msg  # Pass the error message
-                    )
-                else:
-                    raise ValueError(f"Max retries ({max_retries}) exceeded. Last error: {error_msg}")
-                
-            return code
+            if is_valid:
+                return code, None
+            self.log.debug(f"\n=== VALIDATION ERROR ===\nCreative validation failed: {error_msg}\n==================\n")
+            if first_failure is None:
+                first_failure = (code, error_msg)
+        
+        if first_failure is None:
+            raise ValueError("Failed to extract code from response")
+        return first_failure
+
+    def _note_validation_failure(self, error_msg: str, attempt: int, max_retries: int):
+        """Log a failed validation; the last attempt reports it as a generation error"""
+        if attempt < max_retries:
+            self.log.debug(f"Attempting retry {attempt + 1}/{max_retries}")
+        else:
+            self.log.error(f"AI generation error: Max retries ({max_retries}) exceeded. Last error: {error_msg}")
+
+    def _note_attempt_error(self, error: Exception, attempt: int, max_retries: int):
+        """Log an attempt that raised before producing checkable code"""
+        self.log.error(f"AI generation error: {str(error)}")
+        if attempt < max_retries:
+            self.log.debug(f"Attempting retry {attempt + 1}/{max_retries} after error: {str(error)}")
+
+    def generate_with_ai_batch(self, prompts: List[str], is_variation: bool = False) -> List[Optional[str]]:
+        """Answer several prompts with one API request.
+        
+        Prompts are sent as-is (like skip_generation_prompt=True). Results line
+        up with prompts; an answer that is missing or fails validation comes
+        back as None so the caller can fall back to generate_with_ai.
+        """
+        if not prompts:
+            return []
+        
+        # Same per-prompt stub preamble generate_with_ai adds when skipping the generation prompt
+        sections = [_BATCH_PREAMBLE.format(count=len(prompts))]
+        for i, prompt in enumerate(prompts, 1):
+            is_text_art, text = self._text_art_target(prompt)
+            sections.append(f"=== REQUEST {i} ===\n{self.validator.inject_minimal_stubs(is_text_art, text)}\n\n{prompt}")
+        
+        # Escape any curly braces in the prompt
+        safe_prompt = "\n\n".join(sections).replace("{", "{{").replace("}", "}}")
+        
+        try:
+            selected_model = self._select_o1_model(self.current_model)
+            self.log.debug(f"Sending {len(prompts)} batched prompts to {selected_model}")
             
+            response = self.client.chat.completions.create(
+                model=selected_model,
+                messages=[
+                    {"role": "user", "content": safe_prompt}
+                ]
+            )
+            raw_content = response.choices[0].message.content if response.choices else None
         except Exception as e:
-            self.log.error(f"AI generation error: {str(e)}")
-            
-            # Attempt retry if we haven't exceeded max retries
-            if retry_count < max_retries:
-                self.log.debug(f"Attempting retry {retry_count + 1}/{max_retries} after error: {str(e)}")
-                return self.generate_with_ai(
-                    prompt=prompt,
-                    skip_generation_prompt=skip_generation_prompt,
-                    is_variation=is_variation,
-                    retry_count=retry_count + 1,
-                    max_retries=max_retries,
-                    last_code=last_code,  # Preserve any previous code
-                    last_error=str(e)  # Use the exception message as error
-                )
-            
+            self.log.error(f"AI batch generation error: {str(e)}")
+            return [None] * len(prompts)
+        
+        if not raw_content:
+            self.log.error("No response generated from AI")
+            return [None] * len(prompts)
+        
+        # Slice the response at each header; a repeated number keeps the first answer
+        answers = {}
+        headers = list(_ANSWER_HEADER_RE.finditer(raw_content))
+        for header, next_header in zip(headers, headers[1:] + [None]):
+            end = next_header.start() if next_header else len(raw_content)
+            answers.setdefault(int(header.group(1)), raw_content[header.end():end])
+        
+        codes = []
+        for i, prompt in enumerate(prompts, 1):
+            codes.append(self._validate_batch_answer(answers.get(i), prompt, is_variation))
+            if codes[-1] is None:
+                self.log.debug(f"Batch answer {i}/{len(prompts)} missing or rejected")
+        return codes
+
+    def _validate_batch_answer(self, answer: Optional[str], prompt: str, is_variation: bool) -> Optional[str]:
+        """Run one batched answer through the same extraction and validation as generate_with_ai"""
+        if not answer:
+            return None
+        
+        is_text_art, text = self._text_art_target(prompt)
+        code = self.validator.extract_code_from_response(answer, is_variation)
+        if not code:
+            return None
+        
+        code = self.validator.inject_base_code(code, is_text_art, text)
+        is_valid, error_msg = self.validator.validate_creative_code(code, is_snippet=is_variation, is_text_art=is_text_art)
+        if not is_valid:
+            self.log.debug(f"Batch answer failed validation: {error_msg}")
             return None
+        return code
+
+    def _text_art_target(self, prompt: str) -> Tuple[bool, str]:
+        """Return whether a prompt asks for text art and which text to render"""
+        is_text_art = self.text_generator.is_text_requirement(prompt)
+        text = "PRISM"
+        if is_text_art:
+            text_match = _QUOTED_TEXT_RE.search(prompt)
+            if text_match:
+                text = text_match.group(1)
+        return is_text_art, text
 
     def _build_generation_prompt(self, techniques: str, is_text_art: bool = False, text: str = "PRISM") -> str:
         """Build a focused creative prompt with clearer guidance"""
         # Get historical patterns to avoid repetition
-        recent_patterns = self.config.db_manager.get_recent_patterns(limit=3)
-        historical_techniques = self.config.db_manager.get_historical_techniques(limit=5)
-        avoid_patterns = self._get_avoid_patterns(recent_patterns, historical_techniques)
+        avoid_patterns = self._get_cached_avoid_patterns()
         
         # Only get random techniques if none were provided
         additional_guidance = ""
@@ -165,24 +719,13 @@ Pattern & Texture:
 • {', '.join(pattern_techniques)}
 """
         
-        # Get base Processing requirements
-        processing_requirements = self.validator.get_processing_requirements()
-        
-        # Add text art requirements if needed
-        if is_text_art:
-            processing_requirements += "\n\n" + self.validator.TEXT_ART_REQUIREMENTS
+        # Text art requirements are the only variable part of the requirements
+        text_art_requirements = f"{self.validator.TEXT_ART_REQUIREMENTS}\n\n" if is_text_art else ""
         
         # Get minimal stubs that must be present
         code_stubs = self.validator.inject_minimal_stubs(is_text_art, text)
         
-        return f"""=== PROCESSING SKETCH GENERATOR ===
-Create a visually appealing processing animation that loops smoothly over 6 seconds.
-Let your creativity guide the direction - feel free to explore and experiment.
-It's better to do a few things well than try to include everything.
-
-{processing_requirements}
-
-=== STARTING CODE STUBS ===
+        return f"""{_GENERATION_PROMPT_HEAD}{text_art_requirements}=== STARTING CODE STUBS ===
 Start with these required function stubs and modify them:
 
 {code_stubs}
@@ -190,39 +733,47 @@ Start with these required function stubs and modify them:
 === CREATIVE DIRECTION ===
 Consider exploring these techniques: {techniques}
 {f"Try something different than: {', '.join(avoid_patterns)}" if avoid_patterns else ""}
-{additional_guidance}
-
-=== RETURN FORMAT ===
-Return your code between these markers:
-// YOUR CREATIVE CODE GOES HERE
-[your code here]
-// END OF YOUR CREATIVE CODE"""
+{additional_guidance}"""
+
+    def _get_cached_avoid_patterns(self) -> List[str]:
+        """Get avoid patterns, refetching from the database at most every _AVOID_PATTERNS_TTL seconds"""
+        fetched_at, avoid_patterns = self._avoid_cache
+        now = time.monotonic()
+        if fetched_at and now - fetched_at < _AVOID_PATTERNS_TTL:
+            return avoid_patterns
+        
+        recent_patterns, historical_techniques = self.config.db_manager.get_prompt_context(
+            recent_limit=3, history_limit=5
+        )
+        avoid_patterns = self._get_avoid_patterns(recent_patterns, historical_techniques)
+        self._avoid_cache = (now, avoid_patterns)
+        return avoid_patterns
 
     def _get_avoid_patterns(self, recent_patterns, historical_techniques, max_avoid=5) -> List[str]:
         """Helper method to build list of patterns to avoid"""
-        avoid_patterns = []
+        # Techniques from recent patterns first, then the most common historical ones
+        recent_techniques = chain.from_iterable(pattern.techniques for pattern in recent_patterns or ())
+        # History is a handful of short lists, so a plain dict count beats Counter.most_common;
+        # the stable sort keeps first-seen order among ties, as most_common does
+        counts = {}
+        for tech in chain.from_iterable(historical_techniques or ()):
+            counts[tech] = counts.get(tech, 0) + 1
+        common_techniques = sorted(counts, key=counts.__getitem__, reverse=True)[:3]
         
-        # Add techniques from recent patterns
-        if recent_patterns:
-            recent_techniques = [tech for pattern in recent_patterns for tech in pattern.techniques]
-            avoid_patterns.extend(recent_techniques)
-        
-        # Add commonly used historical techniques
-        if historical_techniques:
-            recent_combos = [tech for pattern in historical_techniques for tech in pattern]
-            from collections import Counter
-            common_techniques = Counter(recent_combos).most_common(3)
-            avoid_patterns.extend(tech for tech, _ in common_techniques)
-        
-        # Remove duplicates and limit
-        return list(dict.fromkeys(avoid_patterns))[:max_avoid]
+        # Remove duplicates (keeping first-seen order) and stop once the limit is reached
+        avoid_patterns = {}
+        for tech in chain(recent_techniques, common_techniques):
+            if len(avoid_patterns) >= max_avoid:
+                break
+            avoid_patterns[tech] = None
+        return list(avoid_patterns)
 
     def _get_random_techniques_from_category(self, category: str, count: int = 3) -> List[str]:
         """Get random techniques from a specific category in config"""
-        if category not in self.config.technique_categories:
+        techniques = self._technique_categories.get(category)
+        if techniques is None:
             return []
         
-        techniques = self.config.technique_categories[category]
         # Ensure we don't try to get more items than available
         count = min(count, len(techniques))
         return random.sample(techniques, count)
@@ -233,8 +784,40 @@ Return your code between these markers:
 
     def create_variation(self, original_code: str, modification: str, retry_count: int = 0) -> Optional[str]:
         """Create a variation of existing Processing code using O1 model."""
-        # Build simple, focused prompt
-        base_prompt = f"""Modify this Processing code according to the user's request.
+        base_prompt = self._build_variation_prompt(original_code, modification)
+
+        # Add minimal retry context if needed
+        if retry_count > 0:
+            base_prompt += "\n\nPrevious attempt failed. Ensure code is between markers and uses Processing syntax."
+
+        # Generate variation
+        self._select_o1_model('o1')
+        # Pass is_variation=True to handle validation correctly
+        response = self.generate_with_ai(base_prompt, skip_generation_prompt=True, is_variation=True)
+        
+        # generate_with_ai already handles extraction, cleaning, and validation
+        return response
+
+    def create_variations(self, original_code: str, modification: str, count: int) -> List[Optional[str]]:
+        """Create several variations of the same code from a single API request"""
+        base_prompt = self._build_variation_prompt(original_code, modification)
+        self._select_o1_model('o1')
+        return self.generate_with_ai_batch([base_prompt] * count, is_variation=True)
+
+    def create_variations_concurrent(self, original_code: str, modifications: List[str], max_concurrency: int = 4) -> List[Optional[str]]:
+        """Create one variation per modification with up to max_concurrency requests in flight"""
+        return asyncio.run(self.acreate_variations(original_code, modifications, max_concurrency))
+
+    async def acreate_variations(self, original_code: str, modifications: List[str], max_concurrency: int = 4) -> List[Optional[str]]:
+        """Async counterpart of create_variations_concurrent for callers already inside an event loop"""
+        prompts = [self._build_variation_prompt(original_code, modification) for modification in modifications]
+        self._select_o1_model('o1')
+        return await self.agenerate_many(prompts, max_concurrency, skip_generation_prompt=True, is_variation=True)
+
+    @lru_cache(maxsize=16)
+    def _build_variation_prompt(self, original_code: str, modification: str) -> str:
+        """Build the simple, focused prompt used for variations; retries and top-ups reuse it"""
+        return f"""Modify this Processing code according to the user's request.
 Keep the core animation logic but apply the changes.
 
 Original code:
@@ -254,18 +837,6 @@ Return ONLY the modified code between these markers:
 [your code here]
 // END OF YOUR CREATIVE CODE"""
 
-        # Add minimal retry context if needed
-        if retry_count > 0:
-            base_prompt += "\n\nPrevious attempt failed. Ensure code is between markers and uses Processing syntax."
-
-        # Generate variation
-        self._select_o1_model('o1')
-        # Pass is_variation=True to handle validation correctly
-        response = self.generate_with_ai(base_prompt, skip_generation_prompt=True, is_variation=True)
-        
-        # generate_with_ai already handles extraction, cleaning, and validation
-        return response
-
     def generate_with_wizard(self, prompt_data: dict) -> Optional[str]:
         """Generate code using wizard-provided parameters"""
         techniques_str = ", ".join(prompt_data["techniques"])
@@ -286,40 +857,7 @@ Use the progress variable (0.0 to 1.0) for animation timing.
 Keep the code modular and efficient."""
 
         # Add O1-specific framework
-        full_prompt = f"""=== PROCESSING SKETCH GENERATOR ===
-Create a visually appealing processing based animation that loops smoothly over 6 seconds.
-Let your creativity guide the direction - feel free to experiment and innovate.
-
-=== REQUIRED FUNCTIONS ===
-You MUST define these two functions:
-1. void initSketch() - Called once at start
-2. void runSketch(float progress) - Called each frame with progress (0.0 to 1.0)
-
-=== SYSTEM FRAMEWORK ===
-The system automatically handles these - DO NOT include them:
-• void setup() or draw() functions
-• size(1080, 1080) and frameRate settings
-• background(0) or any background clearing
-• translate(width/2, height/2) for centering
-• Frame saving and program exit
-
-=== CODE STRUCTURE ===
-1. Define any classes at the top
-2. Declare global variables
-3. Define initSketch() for setup
-4. Define runSketch(progress) for animation
-• The canvas is already centered at (0,0)
-• Initialize all variables with values
-• Use RGB values for colors (e.g., stroke(255, 0, 0) for red)
-
-=== CREATIVE DIRECTION ===
-{creative_direction}
-
-=== RETURN FORMAT ===
-Return your code between these markers:
-// YOUR CREATIVE CODE GOES HERE
-[your code here]
-// END OF YOUR CREATIVE CODE"""
+        full_prompt = f"{_WIZARD_PROMPT_HEAD}{creative_direction}\n\n{_RETURN_FORMAT}"
 
         # Use the standard generation pipeline with the wizard prompt
         return self.generate_with_ai(full_prompt, skip_generation_prompt=True)
@@ -327,87 +865,52 @@ Return your code between these markers:
     def generate_code(self, prompt_data: dict, custom_guidelines: str = None, retry_count: int = 0) -> Optional[str]:
         """Generate code using the wizard prompt data"""
         try:
-            # Build base prompt with Processing requirements
-            base_prompt = (
-                "=== PROCESSING SKETCH GENERATOR ===\n"
-                "Create a visually appealing processing animation that loops smoothly over 6 seconds.\n"
-                "Let your creativity guide the direction - feel free to explore and experiment.\n\n"
-                "=== REQUIRED FUNCTIONS ===\n"
-                "You MUST define these two functions:\n"
-                "1. void initSketch() - Called once at start\n"
-                "2. void runSketch(float progress) - Called each frame with progress (0.0 to 1.0)\n\n"
-                "=== SYSTEM FRAMEWORK ===\n"
-                "The system automatically handles these - DO NOT include them:\n"
-                "• void setup() or draw() functions\n"
-                "• size(1080, 1080) and frameRate settings\n"
-                "• background(0) or any background clearing\n"
-                "• translate(width/2, height/2) for centering\n"
-                "• Frame saving and program exit\n\n"
-                "=== CODE STRUCTURE ===\n"
-                "1. Define any classes at the top\n"
-                "2. Declare global variables\n"
-                "3. Define initSketch() for setup\n"
-                "4. Define runSketch(progress) for animation\n"
-                "• The canvas is already centered at (0,0)\n"
-                "• Initialize all variables with values\n"
-                "• Use RGB values for colors (e.g., stroke(255, 0, 0) for red)\n"
-            )
-
-            # Add creative direction from prompt data
-            creative_direction = []
-            if prompt_data.get('techniques'):
-                creative_direction.append(f"Required Techniques: {', '.join(prompt_data['techniques'])}")
-            if prompt_data.get('motion_style'):
-                creative_direction.append(f"Motion Style: {prompt_data['motion_style']}")
-            if prompt_data.get('shape_elements'):
-                creative_direction.append(f"Shape Elements: {prompt_data['shape_elements']}")
-            if prompt_data.get('color_approach'):
-                creative_direction.append(f"Color Approach: {prompt_data['color_approach']}")
-            if prompt_data.get('pattern_type'):
-                creative_direction.append(f"Pattern Type: {prompt_data['pattern_type']}")
-
-            if creative_direction:
-                base_prompt += "\n\n=== CREATIVE DIRECTION ===\n• " + "\n• ".join(creative_direction)
-
-            # Add mode-specific requirements
-            if prompt_data.get("illusion_categories"):
-                base_prompt += f"\n\n=== OPTICAL ILLUSION REQUIREMENTS ===\nCreate a dynamic optical illusion using these categories: {', '.join(prompt_data['illusion_categories'])}\nFocus on strong perceptual impact and smooth execution."
-
-            # Add custom guidelines from either source
-            guidelines = prompt_data.get("custom_guidelines") or custom_guidelines
-            if guidelines:
-                base_prompt += f"\n\n=== CUSTOM REQUIREMENTS ===\n{guidelines}"
-
-            # Add text-specific requirements if needed
-            if prompt_data.get("is_text_art"):
-                text = prompt_data.get("text", "PRISM")
-                base_prompt += "\n\n" + self._get_text_requirements(text)
-
-            # Add animation guidelines
-            base_prompt += (
-                "\n\n=== ANIMATION GUIDELINES ===\n"
-                "• Use the progress variable (0.0 to 1.0) for ALL animations\n"
-                "• Ensure smooth looping by matching start/end states\n"
-                "• Use map() to convert progress to specific ranges\n"
-                "• Use lerp() or lerpColor() for smooth transitions\n"
-                "• Avoid sudden jumps or discontinuities\n"
-                "• Consider easing functions for natural motion\n"
-                "• Test values at progress = 0.0, 0.5, and 1.0\n\n"
-                "=== RETURN FORMAT ===\n"
-                "Return your code between these markers:\n"
-                "// YOUR CREATIVE CODE GOES HERE\n"
-                "[your code here]\n"
-                "// END OF YOUR CREATIVE CODE"
-            )
-            
             # Generate code using the enhanced prompt
-            code = self.generate_with_ai(base_prompt, skip_generation_prompt=True, retry_count=retry_count)
+            code = self.generate_with_ai(self.build_code_prompt(prompt_data, custom_guidelines), skip_generation_prompt=True, retry_count=retry_count)
             return code
             
         except Exception as e:
             self.log.error(f"Error in code generation: {str(e)}")
             return None
 
+    def build_code_prompt(self, prompt_data: dict, custom_guidelines: str = None) -> str:
+        """Build the generate_code prompt for wizard prompt data"""
+        # Build base prompt with Processing requirements
+        base_prompt = _CODE_PROMPT_HEAD
+
+        # Add creative direction from prompt data
+        creative_direction = []
+        if prompt_data.get('techniques'):
+            creative_direction.append(f"Required Techniques: {', '.join(prompt_data['techniques'])}")
+        if prompt_data.get('motion_style'):
+            creative_direction.append(f"Motion Style: {prompt_data['motion_style']}")
+        if prompt_data.get('shape_elements'):
+            creative_direction.append(f"Shape Elements: {prompt_data['shape_elements']}")
+        if prompt_data.get('color_approach'):
+            creative_direction.append(f"Color Approach: {prompt_data['color_approach']}")
+        if prompt_data.get('pattern_type'):
+            creative_direction.append(f"Pattern Type: {prompt_data['pattern_type']}")
+
+        if creative_direction:
+            base_prompt += "\n\n=== CREATIVE DIRECTION ===\n• " + "\n• ".join(creative_direction)
+
+        # Add mode-specific requirements
+        if prompt_data.get("illusion_categories"):
+            base_prompt += f"\n\n=== OPTICAL ILLUSION REQUIREMENTS ===\nCreate a dynamic optical illusion using these categories: {', '.join(prompt_data['illusion_categories'])}\nFocus on strong perceptual impact and smooth execution."
+
+        # Add custom guidelines from either source
+        guidelines = prompt_data.get("custom_guidelines") or custom_guidelines
+        if guidelines:
+            base_prompt += f"\n\n=== CUSTOM REQUIREMENTS ===\n{guidelines}"
+
+        # Add text-specific requirements if needed
+        if prompt_data.get("is_text_art"):
+            text = prompt_data.get("text", "PRISM")
+            base_prompt += "\n\n" + self._get_text_requirements(text)
+
+        # Add animation guidelines
+        return base_prompt + _ANIMATION_GUIDELINES
+
     def _get_text_requirements(self, text: str) -> str:
         """Get text-specific requirements for text art generation"""
         return self.text_generator.get_text_requirements(text)
@@ -1,5 +1,6 @@
 from typing import Optional, List, Dict, Tuple
 import re
+from functools import lru_cache
 from logger import ArtLogger
 
 class TextGenerator:
@@ -72,21 +73,40 @@ letterMask.endDraw();"""
 
     # Required patterns for text art validation
     TEXT_VALIDATION_PATTERNS = [
-        r'PGraphics\s+letterMask\s*;',
-        r'letterMask\s*=\s*createGraphics\s*\(\s*1080\s*,\s*1080\s*\)',
-        r'letterMask\s*\.\s*beginDraw\s*\(\s*\)',
-        r'letterMask\s*\.\s*background\s*\(\s*0\.?0?\s*\)',
-        r'letterMask\s*\.\s*fill\s*\(\s*255\s*\)',
-        r'letterMask\s*\.\s*textAlign\s*\(\s*CENTER\s*,\s*CENTER\s*\)',
-        r'letterMask\s*\.\s*textFont\s*\(\s*createFont\s*\(\s*["\']Arial Unicode MS["\']\s*,\s*\d+\s*\)\s*\)',  # Added font validation
-        r'letterMask\s*\.\s*textSize\s*\(\s*\d+',
-        r'letterMask\s*\.\s*text\s*\(',
-        r'letterMask\s*\.\s*endDraw\s*\(\s*\)'
+        re.compile(r'PGraphics\s+letterMask\s*;'),
+        re.compile(r'letterMask\s*=\s*createGraphics\s*\(\s*1080\s*,\s*1080\s*\)'),
+        re.compile(r'letterMask\s*\.\s*beginDraw\s*\(\s*\)'),
+        re.compile(r'letterMask\s*\.\s*background\s*\(\s*0\.?0?\s*\)'),
+        re.compile(r'letterMask\s*\.\s*fill\s*\(\s*255\s*\)'),
+        re.compile(r'letterMask\s*\.\s*textAlign\s*\(\s*CENTER\s*,\s*CENTER\s*\)'),
+        re.compile(r'letterMask\s*\.\s*textFont\s*\(\s*createFont\s*\(\s*["\']Arial Unicode MS["\']\s*,\s*\d+\s*\)\s*\)'),  # Added font validation
+        re.compile(r'letterMask\s*\.\s*textSize\s*\(\s*\d+'),
+        re.compile(r'letterMask\s*\.\s*text\s*\('),
+        re.compile(r'letterMask\s*\.\s*endDraw\s*\(\s*\)')
     ]
 
+    # All mask patterns as one alternation; group pN records a match of pattern N.
+    # Each match covers exactly one letterMask reference (p0 also takes the PGraphics
+    # before it) and what follows that reference differs per pattern, so no match can
+    # swallow another pattern's text and a single scan finds them all.
+    TEXT_MASK_CHECK_RE = re.compile('|'.join(
+        f'(?P<p{i}>{pattern.pattern})' for i, pattern in enumerate(TEXT_VALIDATION_PATTERNS)
+    ))
+
+    # Text-specific error guidance; always shown with the default text
+    TEXT_ERROR_GUIDANCE = (
+        "\n=== TEXT IMPLEMENTATION REQUIREMENTS ===\n"
+        "• Use letterMask for text rendering\n"
+        "• Initialize letterMask properly\n"
+        "• Ensure proper text boundaries\n"
+        "• Validate mask initialization\n"
+        f"{TEXT_MASK_TEMPLATE.format(text='PRISM')}\n"
+    )
+
     def __init__(self, logger: ArtLogger = None):
         self.log = logger or ArtLogger()
 
+    @lru_cache(maxsize=32)
     def get_text_requirements(self, text: str, custom_guidelines: str = None) -> str:
         """Get comprehensive text art requirements with custom guidelines"""
         base_requirements = (
@@ -111,6 +131,7 @@ letterMask.endDraw();"""
 
         return base_requirements
 
+    @lru_cache(maxsize=32)
     def get_text_mask_template(self, text: str) -> str:
         """Get the text mask template"""
         return self.TEXT_MASK_TEMPLATE.format(text=text)
@@ -122,25 +143,15 @@ letterMask.endDraw();"""
 
         # For text art, verify mask requirements
         if 'letterMask' in code:
-            missing_patterns = []
-            for pattern in self.TEXT_VALIDATION_PATTERNS:
-                if not re.search(pattern, code):
-                    missing_patterns.append(pattern)
-            if missing_patterns:
+            seen = {match.lastgroup for match in self.TEXT_MASK_CHECK_RE.finditer(code)}
+            if len(seen) < len(self.TEXT_VALIDATION_PATTERNS):
                 return False, "Missing required text mask initialization patterns"
 
         return True, None
 
     def build_text_error_guidance(self) -> str:
         """Build text-specific error guidance"""
-        return (
-            "\n=== TEXT IMPLEMENTATION REQUIREMENTS ===\n"
-            "• Use letterMask for text rendering\n"
-            "• Initialize letterMask properly\n"
-            "• Ensure proper text boundaries\n"
-            "• Validate mask initialization\n"
-            f"{self.TEXT_MASK_TEMPLATE.format(text='PRISM')}\n"
-        )
+        return self.TEXT_ERROR_GUIDANCE
 
     def is_text_requirement(self, guidelines: str) -> bool:
         """Check if the guidelines contain text-related requirements"""
@@ -1,8 +1,93 @@
 from typing import Optional, List, Dict, Tuple
 import re
+from functools import lru_cache
+from itertools import chain
 from logger import ArtLogger
 from .text_generator import TextGenerator
 
+# Patterns used by the cleaning, conversion and auto-fix helpers
+_MD_FENCE_HEAD_RE = re.compile(r'^```.*?\n')
+_MD_FENCE_TAIL_RE = re.compile(r'\n```.*?$')
+_DOUBLE_MASK_RE = re.compile(r'(?:letterMask\s*\.\s*)+letterMask')
+_EXTRA_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n')
+_ARRAY_DECL_RE = re.compile(r'(\w+)\[\]\s+(\w+)\s*=\s*new\s+\1\[([^\]]+)\]')
+_ARRAY_INDEX_NUM_RE = re.compile(r'(\w+)\[(\d+)\]')
+_ARRAY_INDEX_VAR_RE = re.compile(r'(\w+)\[(\w+)\]')
+_ARRAY_SET_NUM_RE = re.compile(r'(\w+)\[(\d+)\]\s*=\s*([^;]+)')
+_ARRAY_SET_VAR_RE = re.compile(r'(\w+)\[(\w+)\]\s*=\s*([^;]+)')
+_ARRAY_LENGTH_RE = re.compile(r'(\w+)\.length')
+_JS_DECL_RE = re.compile(r'\b(let|const|var)\s+(\w+)\s*=')
+_JS_FOR_DECL_RE = re.compile(r'for\s*\(\s*(let|const|var)\s+(\w+)')
+_JS_ARROW_LOOP_RE = re.compile(r'\.(?:forEach|map)\s*\(\s*\w+\s*=>\s*{')
+# Math.X -> X for the functions Processing provides globally
+_JS_MATH_RE = re.compile(r'Math\.(PI|sin|cos|random|abs|min|max)')
+_HEX_COLOR_RE = re.compile(r'#([0-9a-fA-F]{6})')
+_MASK_TEXT_ARG_RE = re.compile(r'letterMask\.text\s*\(\s*"([^"]+)"')
+_INIT_SKETCH_OPEN_RE = re.compile(r'void\s+initSketch\s*\(\s*\)\s*\{')
+_INIT_SKETCH_BODY_RE = re.compile(r'(void\s+initSketch\s*\(\s*\)\s*\{[^\}]*)(})')
+
+# Marker text that delimits the creative block in model responses
+_CREATIVE_START = "YOUR CREATIVE CODE GOES HERE"
+_CREATIVE_END = "END OF YOUR CREATIVE CODE"
+
+# Validation results kept per validator; the oldest entry is evicted first
+_VALIDATION_CACHE_SIZE = 128
+
+# Error phrase -> retry prompt branch, checked in order; anything else uses branch 2
+_RETRY_BRANCHES = (
+    ("Missing text initialization", 0),
+    ("Missing required text patterns", 0),
+    ("Missing initSketch() function", 1),
+)
+
+# Retry prompts quote at most this much of the failed code (its tail) and the error (head and tail)
+_MAX_RETRY_CODE = 16384
+_MAX_RETRY_ERROR = 512
+
+@lru_cache(maxsize=128)
+def _build_retry_prompt(branch: int, error_msg: str, code: str) -> str:
+    """Render a retry prompt; models often repeat a mistake, so identical retries come from the cache.
+    
+    branch: 0 = missing text mask, 1 = missing initSketch(), 2 = any other error
+    """
+    if branch == 0:
+        return f"""The code needs letterMask for text art. Add these EXACT lines in initSketch():
+
+letterMask = createGraphics(1080, 1080);
+letterMask.beginDraw();
+letterMask.background(0);
+letterMask.fill(255);
+letterMask.textAlign(CENTER, CENTER);
+letterMask.textSize(200);
+letterMask.text("PRISM", letterMask.width/2, letterMask.height/2);
+letterMask.endDraw();
+
+Previous code:
+{code}
+
+Return ONLY the corrected code between markers."""
+
+    elif branch == 1:
+        return f"""Add initSketch() to initialize your variables:
+
+void initSketch() {{
+    // Initialize variables and setup
+}}
+
+Previous code:
+{code}
+
+Return ONLY the corrected code between markers."""
+
+    # Default retry prompt with minimal guidance
+    return f"""Fix this specific error and return the corrected code:
+Error: {error_msg}
+
+Previous code:
+{code}
+
+Return ONLY the corrected code between markers."""
+
 class CodeValidator:
     # Processing template for sketch framework
     PROCESSING_TEMPLATE = """// === USER'S CREATIVE CODE ===
@@ -72,20 +157,21 @@ void draw() {{
    • Consider easing functions for natural motion
    • Test values at progress = 0.0, 0.5, and 1.0"""
 
-    # Critical validation patterns
-    CRITICAL_VALIDATION_PATTERNS = {
-        r'(?<!\w)size\s*\(': 'Contains size() call - this is handled by the system',
-        r'\bframeRate\s*\(': 'Contains frameRate() call - this is handled by the system',
-        r'\bsaveFrame\s*\(': 'Contains saveFrame() call - this is handled by the system',
-        r'\bexit\s*\(': 'Contains exit() call - this is handled by the system',
-        r'\btranslate\s*\(\s*width\s*/\s*2': 'Contains origin re-centering - coordinates are already centered',
-        r'\btranslate\s*\(\s*height\s*/\s*2': 'Contains origin re-centering - coordinates are already centered'
-    }
+    # Critical validation patterns as (literal every match contains, pattern, error);
+    # the substring check skips the regex for calls the code never mentions
+    CRITICAL_VALIDATION_PATTERNS = (
+        ('size', re.compile(r'(?<!\w)size\s*\('), 'Contains size() call - this is handled by the system'),
+        ('frameRate', re.compile(r'\bframeRate\s*\('), 'Contains frameRate() call - this is handled by the system'),
+        ('saveFrame', re.compile(r'\bsaveFrame\s*\('), 'Contains saveFrame() call - this is handled by the system'),
+        ('exit', re.compile(r'\bexit\s*\('), 'Contains exit() call - this is handled by the system'),
+        ('translate', re.compile(r'\btranslate\s*\(\s*width\s*/\s*2'), 'Contains origin re-centering - coordinates are already centered'),
+        ('translate', re.compile(r'\btranslate\s*\(\s*height\s*/\s*2'), 'Contains origin re-centering - coordinates are already centered'),
+    )
 
     # Required function patterns
     REQUIRED_FUNCTIONS = {
-        'initSketch': r'\bvoid\s+initSketch\s*\(\s*\)',
-        'runSketch': r'\bvoid\s+runSketch\s*\(\s*float\s+\w+\s*\)'
+        'initSketch': re.compile(r'\bvoid\s+initSketch\s*\(\s*\)'),
+        'runSketch': re.compile(r'\bvoid\s+runSketch\s*\(\s*float\s+\w+\s*\)')
     }
 
     # Required system components
@@ -101,25 +187,25 @@ void draw() {{
 
     # Common error patterns and guidance
     ERROR_PATTERNS = {
-        r"Cannot find symbol.*letterMask\.letterMask": "Double letterMask reference - use just letterMask instead",
-        r"cannot find symbol.*class PGraphics": "Missing PGraphics import or declaration",
-        r"cannot find symbol.*ArrayList": "Missing ArrayList import or declaration",
-        r"NullPointerException": "Null object reference - check initialization",
-        r"ArrayIndexOutOfBounds": "Array index out of bounds",
-        r"error: incompatible types:": "Type mismatch in variable assignment",
-        r"error: cannot find symbol": "Undefined variable or method",
-        r"error: ';' expected": "Missing semicolon",
-        r"the method (.*) is undefined": "Undefined method call",
-        r"error: reached end of file while parsing": "Missing closing brace or parenthesis",
-        r"Contains translate\(\)": """• DO NOT use translate() - all positioning should be relative to canvas center (0,0)
+        re.compile(r"Cannot find symbol.*letterMask\.letterMask", re.IGNORECASE): "Double letterMask reference - use just letterMask instead",
+        re.compile(r"cannot find symbol.*class PGraphics", re.IGNORECASE): "Missing PGraphics import or declaration",
+        re.compile(r"cannot find symbol.*ArrayList", re.IGNORECASE): "Missing ArrayList import or declaration",
+        re.compile(r"NullPointerException", re.IGNORECASE): "Null object reference - check initialization",
+        re.compile(r"ArrayIndexOutOfBounds", re.IGNORECASE): "Array index out of bounds",
+        re.compile(r"error: incompatible types:", re.IGNORECASE): "Type mismatch in variable assignment",
+        re.compile(r"error: cannot find symbol", re.IGNORECASE): "Undefined variable or method",
+        re.compile(r"error: ';' expected", re.IGNORECASE): "Missing semicolon",
+        re.compile(r"the method (.*) is undefined", re.IGNORECASE): "Undefined method call",
+        re.compile(r"error: reached end of file while parsing", re.IGNORECASE): "Missing closing brace or parenthesis",
+        re.compile(r"Contains translate\(\)", re.IGNORECASE): """• DO NOT use translate() - all positioning should be relative to canvas center (0,0)
 • Use direct x,y coordinates: x = width/2 + offset
 • For rotations, use rotate() with pushMatrix/popMatrix
 • Remember the canvas is already centered""",
-        r"Creative validation": """• Remove any setup/draw function declarations
+        re.compile(r"Creative validation", re.IGNORECASE): """• Remove any setup/draw function declarations
 • Ensure no background or translate calls
 • Use only the provided progress variable
 • Keep code focused on the creative elements""",
-        r"Core validation": """• Ensure code fits within the template structure
+        re.compile(r"Core validation", re.IGNORECASE): """• Ensure code fits within the template structure
 • Check for proper loop completion
 • Verify all variables are properly scoped
 • Remove any conflicting declarations"""
@@ -143,6 +229,8 @@ letterMask.textSize(200);
 letterMask.text("{text}", letterMask.width/2, letterMask.height/2);
 letterMask.endDraw();"""
     }
+    # letterMask auto-fix with the default text, rendered once
+    DEFAULT_LETTER_MASK_FIX = AUTO_FIX_TEMPLATES['letterMask'].format(text="PRISM")
 
     # Simplified text art requirements
     TEXT_ART_REQUIREMENTS = """=== TEXT ART REQUIREMENTS ===
@@ -184,10 +272,10 @@ void initSketch() {
 
     # Minimal text validation patterns (more flexible)
     MINIMAL_TEXT_PATTERNS = [
-        r'letterMask\s*=\s*createGraphics',  # Basic initialization
-        r'\.beginDraw\s*\(\s*\)',  # Begin draw
-        r'\.text\s*\(',  # Any text call
-        r'\.endDraw\s*\(\s*\)'  # End draw
+        re.compile(r'letterMask\s*=\s*createGraphics'),  # Basic initialization
+        re.compile(r'\.beginDraw\s*\(\s*\)'),  # Begin draw
+        re.compile(r'\.text\s*\('),  # Any text call
+        re.compile(r'\.endDraw\s*\(\s*\)')  # End draw
     ]
 
     # Base stubs for pre-emptive injection
@@ -225,44 +313,66 @@ void runSketch(float progress) {
 }
 """
 
+    # Basic syntax errors checked by is_safe_code
+    SYNTAX_ERROR_PATTERNS = [
+        (re.compile(r'for\s*\([^)]*\.\s*\w+\)'), "Invalid for loop syntax"),
+        (re.compile(r'while\s*\([^)]*\.\s*\w+\)'), "Invalid while loop syntax"),
+        (re.compile(r'\w+\s+\.\s*\w+\s*\('), "Invalid method call syntax with space before dot"),
+        (re.compile(r'\w+\s*\.\s*$'), "Incomplete object reference"),
+        (re.compile(r'\w+\s*\.\s*\)'), "Invalid object reference in parentheses")
+    ]
+
+    # Critical JavaScript syntax that can't be auto-fixed
+    CRITICAL_JS_PATTERNS = [
+        (re.compile(r'color\(([\'"]#[0-9a-fA-F]+[\'"]\))'), "Use RGB values instead of hex codes: color(255, 0, 0)"),
+        (re.compile(r'\b(push|pop)\s*\(\s*\)'), "Use pushMatrix()/popMatrix() instead of push()/pop()"),
+        (re.compile(r'createVector\s*\('), "Use 'new PVector()' instead of createVector()"),
+    ]
+
     def __init__(self, logger: ArtLogger = None, text_generator: TextGenerator = None):
         self.log = logger or ArtLogger()
         self.text_generator = text_generator
+        self._validation_cache: Dict[Tuple[str, bool, bool], Tuple[bool, Optional[str]]] = {}
 
     def validate_creative_code(self, code: str, is_snippet: bool = False, is_text_art: bool = False) -> tuple[bool, str]:
         """Validate creative code with minimal interference"""
+        # Retries and repeated checks often validate the same code again
+        key = (code, is_snippet, is_text_art)
+        result = self._validation_cache.get(key)
+        if result is None:
+            result = self._check_creative_code(code, is_snippet, is_text_art)
+            if len(self._validation_cache) >= _VALIDATION_CACHE_SIZE:
+                del self._validation_cache[next(iter(self._validation_cache))]
+            self._validation_cache[key] = result
+        return result
+
+    def _check_creative_code(self, code: str, is_snippet: bool, is_text_art: bool) -> Tuple[bool, Optional[str]]:
+        """Run the creative code checks, auto-injecting missing stubs where possible"""
         if not code.strip():
             return False, "Empty code"
         
         # Check for critical forbidden patterns
-        for pattern, error in self.CRITICAL_VALIDATION_PATTERNS.items():
-            if re.search(pattern, code):
+        for literal, pattern, error in self.CRITICAL_VALIDATION_PATTERNS:
+            if literal in code and pattern.search(code):
                 return False, error
 
         # Only validate text requirements if this is text art
-        if is_text_art:
-            missing_patterns = []
-            for pattern in self.MINIMAL_TEXT_PATTERNS:
-                if not re.search(pattern, code):
-                    missing_patterns.append(pattern)
-            
-            if missing_patterns:
-                # Try auto-injection first
-                fixed_code = self.inject_base_code(code, is_text_art=True)
-                if fixed_code != code:
-                    return self.validate_creative_code(fixed_code, is_snippet, is_text_art)
+        if is_text_art and not all(pattern.search(code) for pattern in self.MINIMAL_TEXT_PATTERNS):
+            # Try auto-injection first; injected stubs never add forbidden calls,
+            # so only the text patterns need rechecking
+            fixed_code = self.inject_base_code(code, is_text_art=True)
+            if fixed_code == code or not all(pattern.search(fixed_code) for pattern in self.MINIMAL_TEXT_PATTERNS):
                 return False, "Missing required text patterns"
+            code = fixed_code
 
         # For non-snippets, ensure required functions exist
         if not is_snippet:
             # Try auto-injection first
-            fixed_code = self.inject_base_code(code, is_text_art)
-            if fixed_code != code:
-                return self.validate_creative_code(fixed_code, is_snippet, is_text_art)
+            code = self.inject_base_code(code, is_text_art)
             
             # If still missing after injection, return error
             for func_name, pattern in self.REQUIRED_FUNCTIONS.items():
-                if not re.search(pattern, code):
+                if not pattern.search(code):
                     return False, f"Missing {func_name}() function"
 
         return True, None
@@ -271,48 +381,60 @@ void runSketch(float progress) {
         """Clean and prepare user code, with minimal interference to valid Processing code"""
         try:
             # Remove markdown artifacts
-            code = re.sub(r'^```.*?\n', '', code)
-            code = re.sub(r'\n```.*?$', '', code)
+            code = _MD_FENCE_HEAD_RE.sub('', code)
+            code = _MD_FENCE_TAIL_RE.sub('', code)
             code = code.strip()
             
             # Clean special characters and ensure ASCII compatibility
-            code = code.encode('ascii', 'ignore').decode()  # Remove non-ASCII chars
-            code = re.sub(r'[^\x00-\x7F]+', '', code)  # Additional non-ASCII cleanup
+            if not code.isascii():
+                code = code.encode('ascii', 'ignore').decode('ascii')  # Remove non-ASCII chars
             
             # Fix common letterMask issues
-            code = re.sub(r'letterMask\.letterMask', 'letterMask', code)  # Fix double reference
-            code = re.sub(r'letterMask\s*\.\s*letterMask', 'letterMask', code)  # Fix with spaces
+            if 'letterMask' in code:
+                code = _DOUBLE_MASK_RE.sub('letterMask', code)  # Fix doubled references, with or without spaces
             
             # Extract code between markers
-            lines = code.split('\n')
-            cleaned_lines = []
-            in_code_block = False
-            
-            for line in lines:
-                # Skip empty lines at start/end
-                if not in_code_block and not line.strip():
-                    continue
-                    
-                # Check for code block markers
-                if "YOUR CREATIVE CODE GOES HERE" in line:
-                    in_code_block = True
-                    continue
-                elif "END OF YOUR CREATIVE CODE" in line:
-                    break
-                
-                if in_code_block:
-                    cleaned_lines.append(line)
-            
-            code = "\n".join(cleaned_lines)
+            code = self._creative_block_lines(code)
             
             # Clean up multiple blank lines
-            code = re.sub(r'\n\s*\n\s*\n', '\n\n', code)
+            code = _EXTRA_BLANK_LINES_RE.sub('\n\n', code)
             return code.strip()
             
         except Exception as e:
             self.log.error(f"Error cleaning code: {str(e)}")
             return code
 
+    def _creative_block_lines(self, code: str) -> str:
+        """Return the lines after the start marker line, up to (not including) the end marker line"""
+        start = code.find(_CREATIVE_START)
+        if start == -1:
+            return ""
+        line_start = code.rfind('\n', 0, start) + 1
+        end = code.find(_CREATIVE_END, 0, line_start)
+        if end != -1:
+            # The end marker came first
+            return ""
+        body_start = code.find('\n', start) + 1
+        if not body_start:
+            return ""
+        if code.find(_CREATIVE_START, body_start) == -1:
+            # Common case: slice the block directly instead of splitting every line
+            end = code.find(_CREATIVE_END, body_start)
+            if end == -1:
+                return code[body_start:]
+            end_line = code.rfind('\n', body_start, end)
+            return code[body_start:end_line] if end_line != -1 else ""
+        
+        # Repeated start markers inside the block are dropped line by line
+        cleaned_lines = []
+        for line in code[body_start:].split('\n'):
+            if _CREATIVE_START in line:
+                continue
+            if _CREATIVE_END in line:
+                break
+            cleaned_lines.append(line)
+        return "\n".join(cleaned_lines)
+
     def extract_code_from_response(self, response: str, is_variation: bool = False) -> Optional[str]:
         """Extract code from AI response and clean it"""
         try:
@@ -357,13 +479,14 @@ void runSketch(float progress) {
         if error_msg:
             # Check for specific error patterns first
             for pattern, specific_guidance in self.ERROR_PATTERNS.items():
-                if re.search(pattern, error_msg, re.IGNORECASE):
+                if pattern.search(error_msg):
                     guidance.extend(["", "=== SPECIFIC GUIDANCE ==="])
                     guidance.extend(specific_guidance.split('\n'))
                     break
             
             # Add general error type guidance
-            if "cannot find anything named" in error_msg.lower():
+            error_lower = error_msg.lower()
+            if "cannot find anything named" in error_lower:
                 guidance.extend([
                     "",
                     "=== UNDEFINED VARIABLE GUIDANCE ===",
@@ -371,7 +494,7 @@ void runSketch(float progress) {
                     "• Check for typos in variable names",
                     "• Verify variable scope"
                 ])
-            elif "expecting" in error_msg.lower():
+            elif "expecting" in error_lower:
                 guidance.extend([
                     "",
                     "=== SYNTAX ERROR GUIDANCE ===",
@@ -384,20 +507,22 @@ void runSketch(float progress) {
 
     def convert_arrays_to_arraylists(self, code: str) -> str:
         """Convert Java array syntax to ArrayList syntax"""
-        # Find array declarations and initializations
-        array_pattern = r'(\w+)\[\]\s+(\w+)\s*=\s*new\s+\1\[([^\]]+)\]'
-        code = re.sub(array_pattern, r'ArrayList<\1> \2 = new ArrayList<\1>()', code)
-        
-        # Replace array access with ArrayList methods
-        code = re.sub(r'(\w+)\[(\d+)\]', r'\1.get(\2)', code)
-        code = re.sub(r'(\w+)\[(\w+)\]', r'\1.get(\2)', code)
-        
-        # Replace array assignments with ArrayList methods
-        code = re.sub(r'(\w+)\[(\d+)\]\s*=\s*([^;]+)', r'\1.set(\2, \3)', code)
-        code = re.sub(r'(\w+)\[(\w+)\]\s*=\s*([^;]+)', r'\1.set(\2, \3)', code)
+        # Every rewrite needs a literal from its pattern, so absent ones skip the regex pass
+        if '[' in code:
+            # Find array declarations and initializations
+            code = _ARRAY_DECL_RE.sub(r'ArrayList<\1> \2 = new ArrayList<\1>()', code)
+            
+            # Replace array access with ArrayList methods
+            code = _ARRAY_INDEX_NUM_RE.sub(r'\1.get(\2)', code)
+            code = _ARRAY_INDEX_VAR_RE.sub(r'\1.get(\2)', code)
+            
+            # Replace array assignments with ArrayList methods
+            code = _ARRAY_SET_NUM_RE.sub(r'\1.set(\2, \3)', code)
+            code = _ARRAY_SET_VAR_RE.sub(r'\1.set(\2, \3)', code)
         
         # Fix array length references
-        code = re.sub(r'(\w+)\.length', r'\1.size()', code)
+        if '.length' in code:
+            code = _ARRAY_LENGTH_RE.sub(r'\1.size()', code)
         
         return code
 
@@ -406,50 +531,48 @@ void runSketch(float progress) {
         # Extract the list being sorted
         list_name = sort_code.split('.sort')[0].strip()
         
-        # Create a Processing-compatible bubble sort implementation
+        # Stable insertion sort by y: near-linear when the list is already almost sorted, as it
+        # is from one frame to the next, and free of java.util, which generated code may not use
         return f"""// Custom sort implementation
-for (int i = 0; i < {list_name}.size() - 1; i++) {{
-  for (int j = 0; j < {list_name}.size() - i - 1; j++) {{
-    if ({list_name}.get(j).y > {list_name}.get(j + 1).y) {{
-      PVector temp = {list_name}.get(j);
-      {list_name}.set(j, {list_name}.get(j + 1));
-      {list_name}.set(j + 1, temp);
-    }}
+for (int i = 1; i < {list_name}.size(); i++) {{
+  PVector current = {list_name}.get(i);
+  int j = i - 1;
+  while (j >= 0 && {list_name}.get(j).y > current.y) {{
+    {list_name}.set(j + 1, {list_name}.get(j));
+    j--;
   }}
+  {list_name}.set(j + 1, current);
 }}"""
 
     def convert_to_processing(self, code: str) -> str:
         """Convert JavaScript syntax to Processing syntax"""
-        # Replace variable declarations
-        code = re.sub(r'\b(let|const|var)\s+(\w+)\s*=', r'float \2 =', code)
-        
-        # Fix for loop syntax
-        code = re.sub(r'for\s*\(\s*(let|const|var)\s+(\w+)', r'for (int \2', code)
+        # Every rewrite needs a literal from its pattern, so absent ones skip the regex pass
+        if 'let' in code or 'const' in code or 'var' in code:
+            # Replace variable declarations
+            code = _JS_DECL_RE.sub(r'float \2 =', code)
+            
+            # Fix for loop syntax
+            code = _JS_FOR_DECL_RE.sub(r'for (int \2', code)
         
         # Replace forEach/map with for loops
-        code = re.sub(r'\.forEach\s*\(\s*\w+\s*=>\s*{', r') {', code)
-        code = re.sub(r'\.map\s*\(\s*\w+\s*=>\s*{', r') {', code)
+        if '=>' in code:
+            code = _JS_ARROW_LOOP_RE.sub(r') {', code)
         
         # Fix color syntax if needed
-        code = re.sub(r'#([0-9a-fA-F]{6})', lambda m: f'color({int(m.group(1)[:2], 16)}, {int(m.group(1)[2:4], 16)}, {int(m.group(1)[4:], 16)})', code)
+        if '#' in code:
+            code = _HEX_COLOR_RE.sub(lambda m: f'color({int(m.group(1)[:2], 16)}, {int(m.group(1)[2:4], 16)}, {int(m.group(1)[4:], 16)})', code)
         
         # Fix Math functions
-        math_funcs = {
-            'Math.PI': 'PI',
-            'Math.sin': 'sin',
-            'Math.cos': 'cos',
-            'Math.random': 'random',
-            'Math.abs': 'abs',
-            'Math.min': 'min',
-            'Math.max': 'max'
-        }
-        for js, proc in math_funcs.items():
-            code = code.replace(js, proc)
-        
+        if 'Math.' in code:
+            code = _JS_MATH_RE.sub(r'\1', code)
         return code
 
-    def is_safe_code(self, code: str) -> bool:
-        """Less strict validation of Processing syntax, focusing on critical issues"""
+    def is_safe_code(self, code: str, collect_errors: bool = False) -> bool:
+        """Less strict validation of Processing syntax, focusing on critical issues.
+        
+        Stops at the first problem found; collect_errors=True checks every
+        pattern so the log lists all of them.
+        """
         errors = []
         
         # Extract just the user's code portion
@@ -459,29 +582,12 @@ for (int i = 0; i < {list_name}.size() - 1; i++) {{
             "// END OF YOUR CREATIVE CODE"
         )
         
-        # Check for basic syntax errors
-        syntax_errors = [
-            (r'for\s*\([^)]*\.\s*\w+\)', "Invalid for loop syntax"),
-            (r'while\s*\([^)]*\.\s*\w+\)', "Invalid while loop syntax"),
-            (r'\w+\s+\.\s*\w+\s*\(', "Invalid method call syntax with space before dot"),
-            (r'\w+\s*\.\s*$', "Incomplete object reference"),
-            (r'\w+\s*\.\s*\)', "Invalid object reference in parentheses")
-        ]
-        
-        for pattern, error in syntax_errors:
-            if re.search(pattern, user_code):
-                errors.append(error)
-        
-        # Check for critical JavaScript syntax that can't be auto-fixed
-        critical_js_patterns = [
-            (r'color\(([\'"]#[0-9a-fA-F]+[\'"]\))', "Use RGB values instead of hex codes: color(255, 0, 0)"),
-            (r'\b(push|pop)\s*\(\s*\)', "Use pushMatrix()/popMatrix() instead of push()/pop()"),
-            (r'createVector\s*\(', "Use 'new PVector()' instead of createVector()"),
-        ]
-        
-        for pattern, error in critical_js_patterns:
-            if re.search(pattern, user_code):
+        # Basic syntax errors first, then critical JavaScript syntax that can't be auto-fixed
+        for pattern, error in chain(self.SYNTAX_ERROR_PATTERNS, self.CRITICAL_JS_PATTERNS):
+            if pattern.search(user_code):
                 errors.append(error)
+                if not collect_errors:
+                    break
         
         if errors:
             error_msg = "\n• ".join(errors)
@@ -493,14 +599,17 @@ for (int i = 0; i < {list_name}.size() - 1; i++) {{
     def _extract_between_markers(self, code: str, start_marker: str, end_marker: str) -> str:
         """Extract code between markers for validation"""
         try:
-            parts = code.split(start_marker)
-            if len(parts) < 2:
+            start = code.find(start_marker)
+            if start == -1:
                 return code
-            code = parts[1]
-            parts = code.split(end_marker)
-            if len(parts) < 1:
-                return code
-            return parts[0].strip()
+            start += len(start_marker)
+            # Stop at a repeated start marker or the end marker, whichever comes first
+            end = len(code)
+            for marker in (start_marker, end_marker):
+                idx = code.find(marker, start, end)
+                if idx != -1:
+                    end = idx
+            return code[start:end].strip()
         except Exception as e:
             self.log.error(f"Error extracting between markers: {e}")
             return code
@@ -520,7 +629,7 @@ for (int i = 0; i < {list_name}.size() - 1; i++) {{
                         return False, error
 
             # Check for basic syntax issues
-            if not self.is_safe_code(code):
+            if not self.is_safe_code(code, collect_errors=self.log.debug_enabled):
                 return False, "Code contains unsafe or invalid syntax"
 
             return True, None
@@ -543,7 +652,7 @@ for (int i = 0; i < {list_name}.size() - 1; i++) {{
                     return False, f"Max attempts ({max_attempts}) exceeded. Last error: {error}", None
 
             # Additional safety checks
-            if not self.is_safe_code(code):
+            if not self.is_safe_code(code, collect_errors=self.log.debug_enabled):
                 return False, "Code contains unsafe patterns", self.build_error_guidance("unsafe patterns detected")
 
             return True, None, None
@@ -574,17 +683,19 @@ for (int i = 0; i < {list_name}.size() - 1; i++) {{
             if "letterMask = createGraphics" not in code and "void initSketch" in code:
                 # Extract text content if possible
                 text = "PRISM"  # Default
-                text_match = re.search(r'letterMask\.text\s*\(\s*"([^"]+)"', code)
+                text_match = _MASK_TEXT_ARG_RE.search(code)
                 if text_match:
                     text = text_match.group(1)
                 
                 # Insert letterMask template into initSketch
-                letter_mask_init = self.AUTO_FIX_TEMPLATES['letterMask'].format(text=text)
+                if text == "PRISM":
+                    letter_mask_init = self.DEFAULT_LETTER_MASK_FIX
+                else:
+                    letter_mask_init = self._letter_mask_fix(text)
                 
                 # More flexible insertion into initSketch
-                if re.search(r'void\s+initSketch\s*\(\s*\)\s*\{', code):
-                    fixed_code = re.sub(
-                        r'(void\s+initSketch\s*\(\s*\)\s*\{[^\}]*)(})',
+                if _INIT_SKETCH_OPEN_RE.search(code):
+                    fixed_code = _INIT_SKETCH_BODY_RE.sub(
                         fr'\1\n    {letter_mask_init}\n\2',
                         code
                     )
@@ -602,43 +713,15 @@ for (int i = 0; i < {list_name}.size() - 1; i++) {{
 
     def build_retry_prompt(self, code: str, error_msg: str, attempt: int) -> str:
         """Build a focused retry prompt based on the specific error"""
-        if any(phrase in error_msg for phrase in ["Missing text initialization", "Missing required text patterns"]):
-            return f"""The code needs letterMask for text art. Add these EXACT lines in initSketch():
-
-letterMask = createGraphics(1080, 1080);
-letterMask.beginDraw();
-letterMask.background(0);
-letterMask.fill(255);
-letterMask.textAlign(CENTER, CENTER);
-letterMask.textSize(200);
-letterMask.text("PRISM", letterMask.width/2, letterMask.height/2);
-letterMask.endDraw();
-
-Previous code:
-{code}
-
-Return ONLY the corrected code between markers."""
-
-        elif "Missing initSketch() function" in error_msg:
-            return f"""Add initSketch() to initialize your variables:
-
-void initSketch() {{
-    // Initialize variables and setup
-}}
-
-Previous code:
-{code}
-
-Return ONLY the corrected code between markers."""
-
-        # Default retry prompt with minimal guidance
-        return f"""Fix this specific error and return the corrected code:
-Error: {error_msg}
-
-Previous code:
-{code}
-
-Return ONLY the corrected code between markers."""
+        branch = next((branch for phrase, branch in _RETRY_BRANCHES if phrase in error_msg), 2)
+        
+        # Runaway responses and compiler dumps are trimmed; errors usually point near the end of the code
+        if len(code) > _MAX_RETRY_CODE:
+            code = "// ...[truncated]...\n" + code[-_MAX_RETRY_CODE:]
+        if len(error_msg) > _MAX_RETRY_ERROR:
+            half = _MAX_RETRY_ERROR // 2
+            error_msg = f"{error_msg[:half]}\n...[truncated]...\n{error_msg[-half:]}"
+        return _build_retry_prompt(branch, error_msg, code)
 
     def inject_base_code(self, code: str, is_text_art: bool = False, text: str = "PRISM") -> str:
         """Inject necessary base code stubs"""
@@ -647,10 +730,8 @@ Return ONLY the corrected code between markers."""
         # Add initSketch if missing
         if "void initSketch" not in result:
             if is_text_art:
-                # Use text-specific template with proper escaping
-                safe_template = self.BASE_STUBS['textMask'].replace("{", "{{").replace("}", "}}")
-                safe_template = safe_template.replace("{{text}}", "{text}")
-                result = safe_template.format(text=text)
+                # Use text-specific template
+                result = self._text_mask_stub(text)
             else:
                 result = self.BASE_STUBS['initSketch'] + "\n\n" + result
 
@@ -661,8 +742,25 @@ Return ONLY the corrected code between markers."""
         # If text art but no letterMask in initSketch, inject it
         if is_text_art and "letterMask = createGraphics" not in result:
             # Try to inject into existing initSketch
-            if re.search(r'void\s+initSketch\s*\(\s*\)\s*\{', result):
-                mask_init = f"""    // Initialize letterMask
+            if _INIT_SKETCH_OPEN_RE.search(result):
+                result = _INIT_SKETCH_BODY_RE.sub(self._mask_init_replacement(text), result)
+
+        return result
+
+    @lru_cache(maxsize=16)
+    def _letter_mask_fix(self, text: str) -> str:
+        """letterMask auto-fix block for the given text"""
+        return self.AUTO_FIX_TEMPLATES['letterMask'].format(text=text)
+
+    @lru_cache(maxsize=16)
+    def _text_mask_stub(self, text: str) -> str:
+        """Text-art initSketch stub for the given text"""
+        return self.BASE_STUBS['textMask'].replace("{text}", text)
+
+    @lru_cache(maxsize=16)
+    def _mask_init_replacement(self, text: str) -> str:
+        """Replacement template that appends letterMask setup to an initSketch body"""
+        mask_init = f"""    // Initialize letterMask
     letterMask = createGraphics(1080, 1080);
     letterMask.beginDraw();
     letterMask.background(0);
@@ -671,21 +769,11 @@ Return ONLY the corrected code between markers."""
     letterMask.textSize(200);
     letterMask.text("{text}", letterMask.width/2, letterMask.height/2);
     letterMask.endDraw();"""
-                
-                result = re.sub(
-                    r'(void\s+initSketch\s*\(\s*\)\s*\{[^\}]*)(})',
-                    fr'\1\n{mask_init}\n\2',
-                    result
-                )
-
-        return result
+        return fr'\1\n{mask_init}\n\2'
 
+    @lru_cache(maxsize=16)
     def inject_minimal_stubs(self, is_text_art: bool = False, text: str = "PRISM") -> str:
         """Get minimal stubs that should be present before LLM generation"""
         if is_text_art:
-            # Escape curly braces in the template before formatting
-            safe_template = self.TEXT_STUBS.replace("{", "{{").replace("}", "}}")
-            # Add back the format placeholder
-            safe_template = safe_template.replace("{{text}}", "{text}")
-            return safe_template.format(text=text)
+            return self.TEXT_STUBS.replace("{text}", text)
         return self.MINIMAL_STUBS 
\ No newline at end of file
@@ -11,6 +11,9 @@ from models.flux import FluxGenerator
 import json
 import time
 
+# User code section of a saved sketch
+_USER_CODE_SECTION_RE = re.compile(r"(?s)// === USER'S CREATIVE CODE ===\s*(.*?)\s*// END OF YOUR CREATIVE CODE")
+
 class VariationManager:
     def __init__(self, config: Config, log: ArtLogger, generator: ProcessingGenerator, db):
         self.config = config
@@ -135,10 +138,7 @@ class VariationManager:
                 original_code = f.read()
             
             # Extract user code section with more flexible regex
-            user_code_match = re.search(
-                r"(?s)// === USER'S CREATIVE CODE ===\s*(.*?)\s*// END OF YOUR CREATIVE CODE", 
-                original_code
-            )
+            user_code_match = _USER_CODE_SECTION_RE.search(original_code)
             if not user_code_match:
                 self.log.error("Could not extract user code section")
                 return
@@ -164,6 +164,17 @@ class VariationManager:
             # Get single modification to apply to all variations
             modification = self._get_variation_modification()
             
+            # Request all variations in one batch up front and top up rejected ones
+            # concurrently; retries fall back to single requests
+            o1_generator = self.generator.o1_generator
+            pregenerated = []
+            if num_variations > 1:
+                pregenerated = [code for code in o1_generator.create_variations(user_code, modification, num_variations) if code]
+                missing = num_variations - len(pregenerated)
+                if missing:
+                    extra = o1_generator.create_variations_concurrent(user_code, [modification] * missing)
+                    pregenerated.extend(code for code in extra if code)
+            
             # Generate variations using the same modification
             for i in range(num_variations):
                 self.log.info(f"\nCreating variation {i+1} of {num_variations}")
@@ -176,8 +187,10 @@ class VariationManager:
                         self.log.info(f"Retry attempt {retry} of {max_retries-1}")
                     
                     # Use O1's variation generation
-                    o1_generator = self.generator.o1_generator
-                    new_code = o1_generator.create_variation(user_code, modification, retry)
+                    if retry == 0 and pregenerated:
+                        new_code = pregenerated.pop(0)
+                    else:
+                        new_code = o1_generator.create_variation(user_code, modification, retry)
                     
                     if not new_code:
                         self.log.error(f"Attempt {retry+1}: Failed to generate valid code. Retrying...")
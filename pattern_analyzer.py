@@ -406,14 +406,15 @@ class PatternAnalyzer:
                 return 10.0
             
             current_set = set(techniques)
-            historical_sets = [set(h) for h in historical]
             
-            # Check for exact matches
-            if current_set in historical_sets:
-                return 0.0
-            
-            # Check for partial matches
-            partial_matches = sum(1 for h in historical_sets if h.intersection(current_set))
+            # One pass over history: any exact match zeroes the bonus, partial matches reduce it
+            partial_matches = 0
+            for h in historical:
+                historical_set = set(h)
+                if historical_set == current_set:
+                    return 0.0
+                if not current_set.isdisjoint(historical_set):
+                    partial_matches += 1
             
             return max(0.0, 10.0 - (partial_matches * 2.0))
             